@@ -5,663 +5,582 @@ Tests the new security modules: firewall, gateway protection, lockdown mode, and
 """
 
 import sys
+import argparse
 import json
+import functools
+import hashlib
+import logging
+import re
 import subprocess
-import time
+import threading
 import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode("utf-8")
+
+
+# One stderr handler shared by every test thread, instead of a print() per line on stdout
+logger = logging.getLogger("sec_test")
+_handler = logging.StreamHandler(sys.stderr)
+_handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s: %(message)s", datefmt="%H:%M:%S"))
+logger.addHandler(_handler)
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+
+@dataclass(slots=True)
+class CheckResult:
+    status: str
+    details: str = ""
+    error: str = ""
+
+    def to_dict(self) -> Dict[str, str]:
+        if self.status == "PASSED":
+            return {"status": self.status, "details": self.details}
+        return {"status": self.status, "error": self.error}
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, CheckResult):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_dumps_pretty(obj: Any) -> bytes:
+    if orjson:
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_INDENT_2 | orjson.OPT_PASSTHROUGH_DATACLASS)
+    return json.dumps(obj, indent=2, default=_json_default).encode("utf-8")
+
+
+# status is PASSED, FAILED or ERROR; detail is the success message or the error
+CheckOutcome = namedtuple("CheckOutcome", "key label ok detail status")
+
+
+def check_case(key: str, label: str):
+    """Run a check that returns (passed, detail), log it and return its CheckOutcome.
+
+    `detail` is the success message when the check passes and the error otherwise; an
+    exception is reported as ERROR.
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrap(self) -> CheckOutcome:
+            self.log(f"Testing {label}...")
+            try:
+                passed, detail = fn(self)
+            except Exception as e:
+                passed, detail, status = False, str(e), "ERROR"
+            else:
+                status = "PASSED" if passed else "FAILED"
+            if passed:
+                self.log(f"✅ {label} - PASSED")
+            else:
+                self.log(f"❌ {label} - {status}: {detail}")
+            return CheckOutcome(key, label, passed, detail, status)
+        return wrap
+    return deco
+
+# Resident Node worker: reads one {"id", "cmd", ...} JSON line per request and answers with
+# one {"id", "ok", "result"|"error"} line. "eval" runs `code` as the body of an async
+# function; "describe" imports each of `modules` and reports the typeof of every export
+# plus the keys of object exports. console.log goes to stderr so stray output cannot
+# corrupt the reply stream. Imports go through `load()`, which imports absolute paths as
+# file:// URLs and hands back the same module promise for repeat paths.
+NODE_WORKER_SCRIPT = '''
+import readline from 'node:readline';
+import { pathToFileURL } from 'node:url';
+
+const AsyncFunction = (async () => {}).constructor;
+console.log = (...args) => console.error(...args);
+
+const modCache = new Map();
+globalThis.load = (path) => {
+    if (!modCache.has(path)) modCache.set(path, import(path.startsWith('/') ? pathToFileURL(path).href : path));
+    return modCache.get(path);
+};
+
+const describe = async (path) => {
+    try {
+        const mod = await load(path);
+        const exports = {};
+        const keys = {};
+        for (const [name, value] of Object.entries(mod)) {
+            exports[name] = typeof value;
+            if (value && typeof value === 'object') keys[name] = Object.keys(value);
+        }
+        return { success: true, exports, keys };
+    } catch (err) {
+        return { success: false, error: String(err) };
+    }
+};
+
+const commands = {
+    eval: (msg) => new AsyncFunction(msg.code)(),
+    describe: async (msg) => {
+        const entries = await Promise.all(
+            Object.entries(msg.modules).map(async ([name, path]) => [name, await describe(path)])
+        );
+        return { success: true, modules: Object.fromEntries(entries) };
+    },
+};
+
+const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+for await (const line of rl) {
+    if (!line) continue;
+    const msg = JSON.parse(line);
+    let reply;
+    try {
+        reply = { id: msg.id, ok: true, result: await commands[msg.cmd](msg) };
+    } catch (err) {
+        reply = { id: msg.id, ok: false, error: String((err && err.stack) || err) };
+    }
+    process.stdout.write(JSON.stringify(reply) + '\\n');
+}
+'''
+
+def _private_dir(name: str) -> Optional[str]:
+    """~/.cache/clawdbot-security-tests/<name>, usable only by the current user, or None"""
+    path = os.path.join(os.path.expanduser("~"), ".cache", "clawdbot-security-tests", name)
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+        if st.st_uid != os.getuid() or not os.path.isdir(path) or os.path.islink(path):
+            return None
+        if st.st_mode & 0o077:
+            os.chmod(path, 0o700)
+    except OSError:
+        return None
+    return path
+
+
+def _alternation(words) -> str:
+    # Longest first so a term is never shadowed by one of its prefixes
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
 class CybersecurityDefenseTestSuite:
-    def __init__(self):
+    EXPORT_MODULES = {
+        "firewall": "/app/dist/security/firewall.js",
+        "gateway": "/app/dist/security/gateway-protection.js",
+        "lockdown": "/app/dist/security/lockdown-mode.js",
+        "dashboard": "/app/dist/security/integration/dashboard-handlers.js",
+    }
+    FIREWALL_EXPECTED = frozenset({
+        "isIpBlocked", "blockIp", "unblockIp", "getBlockedIps",
+        "recordFailedAuth", "checkApiRateLimit", "checkLoginRateLimit",
+        "trackWsConnection", "releaseWsConnection", "validateHeaders",
+        "validatePayloadSize", "validateUrlLength", "detectAttackPatterns",
+        "logSecurityIncident", "getSecurityLog", "getSecurityStats"
+    })
+    GATEWAY_EXPECTED = frozenset({
+        "trackGatewayConnection", "removeGatewayConnection",
+        "authenticateGateway", "getActiveConnections", "getGatewayStats"
+    })
+    LOCKDOWN_EXPECTED = frozenset({
+        "getLockdownState", "isLockdownActive", "activateLockdown",
+        "deactivateLockdown", "isAdminUser", "checkLockdownAccess"
+    })
+    # Dashboard handler names double as the gateway method names in server-methods-list.ts
+    SECURITY_METHODS = frozenset({
+        "security.dashboard", "security.blocked.list", "security.blocked.add",
+        "security.blocked.remove", "security.incidents.list",
+        "security.gateway.connections", "security.lockdown.toggle",
+        "security.lockdown.status"
+    })
+    ENV_EXPECTED = frozenset({
+        "SECURITY_FIREWALL", "SECURITY_STRICT_MODE", "MAX_PAYLOAD_SIZE_BYTES",
+        "RATE_LIMIT_API_PER_MINUTE", "RATE_LIMIT_LOGIN_PER_HOUR", "RATE_LIMIT_WS_PER_IP",
+        "AUTO_BLOCK_DURATION_MS", "MAX_FAILED_AUTH_ATTEMPTS", "GATEWAY_PASSWORD_REQUIRED",
+        "GATEWAY_PASSWORD", "GATEWAY_MAX_CONNECTIONS", "GATEWAY_CONNECTION_TIMEOUT_MS",
+        "SECURITY_LOCKDOWN", "SECURITY_ADMIN_EMAIL", "SECURITY_EMERGENCY",
+        "SECURITY_ADMIN_ONLY", "SECURITY_CHAT_DISABLED", "SECURITY_TOOLS_DISABLED",
+        "SECURITY_GATEWAY_RESTRICTED", "KILL_SWITCH", "KILL_SWITCH_CONFIRM_CODE"
+    })
+    DEPLOY_DOCS_SECTIONS = frozenset({
+        "Security Configuration", "Basic Security Setup", "Gateway Protection",
+        "Lockdown Mode", "Emergency Mode", "Kill Switch", "Security Dashboard"
+    })
+    CHANGELOG_ELEMENTS = frozenset({
+        "2026.1.28-fix.2", "Cybersecurity Defense System", "Request Firewall (Mini-WAF)",
+        "Rate Limiting", "Gateway Protection", "Lockdown Mode", "Security Dashboard"
+    })
+    # One scan per file instead of one substring search per expected term
+    SECURITY_METHODS_RE = re.compile(f'"({_alternation(SECURITY_METHODS)})"')
+    ENV_EXPECTED_RE = re.compile(rf"^(?:#\s*)?({_alternation(ENV_EXPECTED)})=", re.M)
+    DEPLOY_DOCS_SECTIONS_RE = re.compile(_alternation(DEPLOY_DOCS_SECTIONS))
+    CHANGELOG_ELEMENTS_RE = re.compile(_alternation(CHANGELOG_ELEMENTS))
+    # Node results for unchanged dist/ are only reused with --reuse-cache
+    CACHE_DIR_NAME = "results"
+    CACHE_MAX_ENTRIES = 256
+    DIST_DIR = "/app/dist"
+    NODE_COMPILE_CACHE_DIR_NAME = "node-compile-cache"
+    NODE_SCRIPT_DIR_NAME = "scripts"
+
+    def __init__(self, reuse_cache: bool = False):
+        # Cached verdicts were not produced by this run, so they are opt-in and kept private
+        self.cache_dir = _private_dir(self.CACHE_DIR_NAME) if reuse_cache else None
+        self._dist_digest = None
         self.tests_run = 0
         self.tests_passed = 0
         self.failed_tests = []
         self.test_results = {}
+        self._node_proc = None
+        self._node_error = None
+        self._node_seq = 0
+        self._node_memo = {}
+        self._export_checks = None
+        self._file_cache = {}
+        # Tests run on a thread pool: _node_lock serializes use of the worker pipe
+        self._node_lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self.start_node_worker()
         
     def log(self, message: str, level: str = "INFO"):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {level}: {message}")
+        logger.log(logging.getLevelName(level), message)
         
-    def run_node_test(self, test_code: str) -> Dict[str, Any]:
-        """Run Node.js test code and return results"""
+    def start_node_worker(self):
+        """Start the resident Node process that evaluates test bodies"""
+        env = dict(os.environ)
+        compile_cache_dir = _private_dir(self.NODE_COMPILE_CACHE_DIR_NAME)
+        if compile_cache_dir:
+            env["NODE_COMPILE_CACHE"] = compile_cache_dir
         try:
-            # Create a temporary test file
-            test_file = "/tmp/security_test.mjs"
-            with open(test_file, "w") as f:
-                f.write(test_code)
-            
-            # Run the test
-            result = subprocess.run(
-                ["node", test_file], 
-                capture_output=True, 
-                text=True, 
-                cwd="/app"
+            self._node_proc = subprocess.Popen(
+                ["node", *self._worker_script_args()],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                cwd="/app",
+                # Nothing sensitive is open yet; skip closing every fd up to RLIMIT_NOFILE
+                close_fds=False,
+                # Node 22.1+ keeps compiled module bytecode here across runs; older versions ignore it
+                env=env
             )
-            
-            if result.returncode == 0:
-                try:
-                    # Try to parse JSON output
-                    return json.loads(result.stdout.strip())
-                except json.JSONDecodeError:
-                    return {"success": True, "output": result.stdout}
-            else:
-                return {"success": False, "error": result.stderr, "output": result.stdout}
-                
         except Exception as e:
-            return {"success": False, "error": str(e)}
-        finally:
-            # Clean up temp file
-            if os.path.exists(test_file):
-                os.remove(test_file)
-    
-    def test_firewall_module_exports(self):
-        """Test firewall.ts module exports all required functions"""
-        self.log("Testing firewall module exports...")
-        self.tests_run += 1
-        
-        test_code = '''
-import { 
-    FIREWALL_CONFIG, 
-    isIpBlocked, 
-    blockIp, 
-    unblockIp, 
-    getBlockedIps, 
-    recordFailedAuth, 
-    checkApiRateLimit, 
-    checkLoginRateLimit, 
-    trackWsConnection, 
-    releaseWsConnection, 
-    validateHeaders, 
-    validatePayloadSize, 
-    validateUrlLength, 
-    detectAttackPatterns, 
-    logSecurityIncident, 
-    getSecurityLog, 
-    getSecurityStats 
-} from '/app/dist/security/firewall.js';
+            self._node_proc = None
+            self._node_error = str(e)
 
-const result = {
-    success: true,
-    exports: {
-        FIREWALL_CONFIG: typeof FIREWALL_CONFIG,
-        isIpBlocked: typeof isIpBlocked,
-        blockIp: typeof blockIp,
-        unblockIp: typeof unblockIp,
-        getBlockedIps: typeof getBlockedIps,
-        recordFailedAuth: typeof recordFailedAuth,
-        checkApiRateLimit: typeof checkApiRateLimit,
-        checkLoginRateLimit: typeof checkLoginRateLimit,
-        trackWsConnection: typeof trackWsConnection,
-        releaseWsConnection: typeof releaseWsConnection,
-        validateHeaders: typeof validateHeaders,
-        validatePayloadSize: typeof validatePayloadSize,
-        validateUrlLength: typeof validateUrlLength,
-        detectAttackPatterns: typeof detectAttackPatterns,
-        logSecurityIncident: typeof logSecurityIncident,
-        getSecurityLog: typeof getSecurityLog,
-        getSecurityStats: typeof getSecurityStats
-    }
-};
+    def _worker_script_args(self) -> List[str]:
+        """Run the worker from a content-addressed .mjs file so the compile cache covers it.
 
-console.log(JSON.stringify(result));
-'''
-        
+        Node only caches bytecode for modules loaded from disk, not for `-e` source. The file
+        lives in a private per-user directory and is only reused if its bytes still hash to
+        the expected digest; otherwise it is rewritten. Fall back to `-e` when no private
+        directory is available.
+        """
+        source = NODE_WORKER_SCRIPT.encode()
+        digest = hashlib.blake2b(source, digest_size=8).hexdigest()
+        script_dir = _private_dir(self.NODE_SCRIPT_DIR_NAME)
+        if script_dir is None:
+            return ["--input-type=module", "-e", NODE_WORKER_SCRIPT]
+        path = os.path.join(script_dir, f"worker-{digest}.mjs")
         try:
-            result = self.run_node_test(test_code)
-            
-            if result.get("success"):
-                exports = result.get("exports", {})
-                expected_functions = [
-                    "isIpBlocked", "blockIp", "unblockIp", "getBlockedIps", 
-                    "recordFailedAuth", "checkApiRateLimit", "checkLoginRateLimit",
-                    "trackWsConnection", "releaseWsConnection", "validateHeaders",
-                    "validatePayloadSize", "validateUrlLength", "detectAttackPatterns",
-                    "logSecurityIncident", "getSecurityLog", "getSecurityStats"
-                ]
-                
-                missing_functions = [f for f in expected_functions if exports.get(f) != "function"]
-                
-                if not missing_functions and exports.get("FIREWALL_CONFIG") == "object":
-                    self.tests_passed += 1
-                    self.log("✅ Firewall module exports - PASSED")
-                    self.test_results["firewall_exports"] = {
-                        "status": "PASSED",
-                        "details": "All required functions and config exported correctly"
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("Firewall module exports")
-                    self.log(f"❌ Firewall module exports - FAILED: Missing functions: {missing_functions}")
-                    self.test_results["firewall_exports"] = {
-                        "status": "FAILED",
-                        "error": f"Missing functions: {missing_functions}"
-                    }
-                    return False
-            else:
-                self.failed_tests.append("Firewall module exports")
-                self.log(f"❌ Firewall module exports - FAILED: {result.get('error', 'Unknown error')}")
-                self.test_results["firewall_exports"] = {
-                    "status": "FAILED",
-                    "error": result.get('error', 'Unknown error')
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("Firewall module exports")
-            self.log(f"❌ Firewall module exports - ERROR: {str(e)}")
-            self.test_results["firewall_exports"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_gateway_protection_module_exports(self):
-        """Test gateway-protection.ts module exports all required functions"""
-        self.log("Testing gateway protection module exports...")
-        self.tests_run += 1
-        
-        test_code = '''
-import { 
-    GATEWAY_SECURITY_CONFIG,
-    trackGatewayConnection,
-    removeGatewayConnection,
-    authenticateGateway,
-    getActiveConnections,
-    getGatewayStats
-} from '/app/dist/security/gateway-protection.js';
-
-const result = {
-    success: true,
-    exports: {
-        GATEWAY_SECURITY_CONFIG: typeof GATEWAY_SECURITY_CONFIG,
-        trackGatewayConnection: typeof trackGatewayConnection,
-        removeGatewayConnection: typeof removeGatewayConnection,
-        authenticateGateway: typeof authenticateGateway,
-        getActiveConnections: typeof getActiveConnections,
-        getGatewayStats: typeof getGatewayStats
-    }
-};
+            with open(path, "rb") as f:
+                if hashlib.blake2b(f.read(), digest_size=8).hexdigest() == digest:
+                    return [path]
+        except OSError:
+            pass
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(source)
+            os.replace(tmp_path, path)
+            return [path]
+        except OSError:
+            return ["--input-type=module", "-e", NODE_WORKER_SCRIPT]
 
-console.log(JSON.stringify(result));
-'''
-        
+    def close(self):
+        """Shut down the Node worker"""
+        if self._node_proc is None:
+            return
         try:
-            result = self.run_node_test(test_code)
-            
-            if result.get("success"):
-                exports = result.get("exports", {})
-                expected_functions = [
-                    "trackGatewayConnection", "removeGatewayConnection", 
-                    "authenticateGateway", "getActiveConnections", "getGatewayStats"
-                ]
-                
-                missing_functions = [f for f in expected_functions if exports.get(f) != "function"]
-                
-                if not missing_functions and exports.get("GATEWAY_SECURITY_CONFIG") == "object":
-                    self.tests_passed += 1
-                    self.log("✅ Gateway protection module exports - PASSED")
-                    self.test_results["gateway_protection_exports"] = {
-                        "status": "PASSED",
-                        "details": "All required functions and config exported correctly"
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("Gateway protection module exports")
-                    self.log(f"❌ Gateway protection module exports - FAILED: Missing functions: {missing_functions}")
-                    self.test_results["gateway_protection_exports"] = {
-                        "status": "FAILED",
-                        "error": f"Missing functions: {missing_functions}"
-                    }
-                    return False
-            else:
-                self.failed_tests.append("Gateway protection module exports")
-                self.log(f"❌ Gateway protection module exports - FAILED: {result.get('error', 'Unknown error')}")
-                self.test_results["gateway_protection_exports"] = {
-                    "status": "FAILED",
-                    "error": result.get('error', 'Unknown error')
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("Gateway protection module exports")
-            self.log(f"❌ Gateway protection module exports - ERROR: {str(e)}")
-            self.test_results["gateway_protection_exports"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_lockdown_mode_module_exports(self):
-        """Test lockdown-mode.ts module exports all required functions"""
-        self.log("Testing lockdown mode module exports...")
-        self.tests_run += 1
-        
-        test_code = '''
-import { 
-    LOCKDOWN_CONFIG,
-    getLockdownState,
-    isLockdownActive,
-    activateLockdown,
-    deactivateLockdown,
-    isAdminUser,
-    checkLockdownAccess
-} from '/app/dist/security/lockdown-mode.js';
+            self._node_proc.stdin.close()
+            self._node_proc.wait(timeout=10)
+        except Exception:
+            self._node_proc.kill()
+        self._node_proc = None
 
-const result = {
-    success: true,
-    exports: {
-        LOCKDOWN_CONFIG: typeof LOCKDOWN_CONFIG,
-        getLockdownState: typeof getLockdownState,
-        isLockdownActive: typeof isLockdownActive,
-        activateLockdown: typeof activateLockdown,
-        deactivateLockdown: typeof deactivateLockdown,
-        isAdminUser: typeof isAdminUser,
-        checkLockdownAccess: typeof checkLockdownAccess
-    }
-};
+    def run_node_test(self, test_code: str, memoize: bool = False,
+                      deps: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Evaluate an async function body in the Node worker and return its result"""
+        return self._worker_rpc({"cmd": "eval", "code": test_code}, memoize, deps)
 
-console.log(JSON.stringify(result));
-'''
-        
-        try:
-            result = self.run_node_test(test_code)
-            
-            if result.get("success"):
-                exports = result.get("exports", {})
-                expected_functions = [
-                    "getLockdownState", "isLockdownActive", "activateLockdown",
-                    "deactivateLockdown", "isAdminUser", "checkLockdownAccess"
-                ]
-                
-                missing_functions = [f for f in expected_functions if exports.get(f) != "function"]
-                
-                if not missing_functions and exports.get("LOCKDOWN_CONFIG") == "object":
-                    self.tests_passed += 1
-                    self.log("✅ Lockdown mode module exports - PASSED")
-                    self.test_results["lockdown_mode_exports"] = {
-                        "status": "PASSED",
-                        "details": "All required functions and config exported correctly"
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("Lockdown mode module exports")
-                    self.log(f"❌ Lockdown mode module exports - FAILED: Missing functions: {missing_functions}")
-                    self.test_results["lockdown_mode_exports"] = {
-                        "status": "FAILED",
-                        "error": f"Missing functions: {missing_functions}"
-                    }
-                    return False
-            else:
-                self.failed_tests.append("Lockdown mode module exports")
-                self.log(f"❌ Lockdown mode module exports - FAILED: {result.get('error', 'Unknown error')}")
-                self.test_results["lockdown_mode_exports"] = {
-                    "status": "FAILED",
-                    "error": result.get('error', 'Unknown error')
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("Lockdown mode module exports")
-            self.log(f"❌ Lockdown mode module exports - ERROR: {str(e)}")
-            self.test_results["lockdown_mode_exports"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_dashboard_handlers_module_exports(self):
-        """Test dashboard-handlers.ts module exports securityDashboardHandlers"""
-        self.log("Testing dashboard handlers module exports...")
-        self.tests_run += 1
-        
-        test_code = '''
-import { securityDashboardHandlers } from '/app/dist/security/integration/dashboard-handlers.js';
+    def _worker_rpc(self, request: Dict[str, Any], memoize: bool = False,
+                    deps: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Send one request to the Node worker and return its result.
 
-const result = {
-    success: true,
-    exports: {
-        securityDashboardHandlers: typeof securityDashboardHandlers
-    },
-    handlers: Object.keys(securityDashboardHandlers || {})
-};
+        With memoize=True a successful result is reused for an identical request; only use
+        it for side-effect-free requests such as export checks. With reuse_cache, passing
+        `deps` also caches the result on disk across runs, keyed by the request, those files
+        and every file under dist/ so a change to any imported module invalidates it.
+        """
+        payload = json_dumps(request)
+        key = hashlib.blake2b(payload).digest() if memoize else None
+        if key is not None and key in self._node_memo:
+            return self._node_memo[key]
 
-console.log(JSON.stringify(result));
-'''
-        
+        cache_path = None
+        if deps and self.cache_dir:
+            cache_path = os.path.join(self.cache_dir, self._cache_key(payload, deps) + ".json")
+        result = self._read_cached_result(cache_path) if cache_path else None
+
+        if result is None:
+            with self._node_lock:
+                result = self._send_to_worker(payload)
+            if cache_path and result.get("success"):
+                self._write_cached_result(cache_path, result)
+
+        if key is not None and result.get("success"):
+            self._node_memo[key] = result
+        return result
+
+    def _cache_key(self, payload: bytes, paths: List[str]) -> str:
+        h = hashlib.blake2b(payload)
+        h.update(self._dist_tree_digest())
+        for path in paths:
+            h.update(path.encode())
+            try:
+                h.update(str(os.stat(path).st_mtime_ns).encode())
+            except OSError:
+                h.update(b"\0")
+        return h.hexdigest()
+
+    def _dist_tree_digest(self) -> bytes:
+        """Digest of the path, size and mtime of every file under dist/, computed once per run"""
+        with self._node_lock:
+            if self._dist_digest is None:
+                h = hashlib.blake2b(digest_size=16)
+                for root, dirs, files in os.walk(self.DIST_DIR):
+                    dirs.sort()
+                    for name in sorted(files):
+                        path = os.path.join(root, name)
+                        try:
+                            st = os.stat(path)
+                        except OSError:
+                            continue
+                        h.update(f"{path}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+                self._dist_digest = h.digest()
+            return self._dist_digest
+
+    def _read_cached_result(self, cache_path: str) -> Optional[Dict[str, Any]]:
         try:
-            result = self.run_node_test(test_code)
-            
-            if result.get("success"):
-                exports = result.get("exports", {})
-                handlers = result.get("handlers", [])
-                
-                expected_handlers = [
-                    "security.dashboard", "security.blocked.list", "security.blocked.add",
-                    "security.blocked.remove", "security.incidents.list", 
-                    "security.gateway.connections", "security.lockdown.toggle",
-                    "security.lockdown.status"
-                ]
-                
-                missing_handlers = [h for h in expected_handlers if h not in handlers]
-                
-                if exports.get("securityDashboardHandlers") == "object" and not missing_handlers:
-                    self.tests_passed += 1
-                    self.log("✅ Dashboard handlers module exports - PASSED")
-                    self.test_results["dashboard_handlers_exports"] = {
-                        "status": "PASSED",
-                        "details": f"All required handlers exported: {handlers}"
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("Dashboard handlers module exports")
-                    self.log(f"❌ Dashboard handlers module exports - FAILED: Missing handlers: {missing_handlers}")
-                    self.test_results["dashboard_handlers_exports"] = {
-                        "status": "FAILED",
-                        "error": f"Missing handlers: {missing_handlers}"
-                    }
-                    return False
-            else:
-                self.failed_tests.append("Dashboard handlers module exports")
-                self.log(f"❌ Dashboard handlers module exports - FAILED: {result.get('error', 'Unknown error')}")
-                self.test_results["dashboard_handlers_exports"] = {
-                    "status": "FAILED",
-                    "error": result.get('error', 'Unknown error')
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("Dashboard handlers module exports")
-            self.log(f"❌ Dashboard handlers module exports - ERROR: {str(e)}")
-            self.test_results["dashboard_handlers_exports"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_server_methods_integration(self):
-        """Test server-methods.ts imports and includes securityDashboardHandlers"""
-        self.log("Testing server methods integration...")
-        self.tests_run += 1
-        
-        test_code = '''
-import fs from 'fs';
+            with open(cache_path, "rb") as f:
+                result = json_loads(f.read())
+            # Touch the entry so eviction keeps recently used results
+            os.utime(cache_path)
+            return result
+        except (OSError, ValueError):
+            return None
 
-const serverMethodsContent = fs.readFileSync('/app/src/gateway/server-methods.ts', 'utf8');
+    def _write_cached_result(self, cache_path: str, result: Dict[str, Any]):
+        try:
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(json_dumps(result))
+            os.replace(tmp_path, cache_path)
 
-const result = {
-    success: true,
-    hasImport: serverMethodsContent.includes('securityDashboardHandlers'),
-    hasInclude: serverMethodsContent.includes('...securityDashboardHandlers'),
-    importLine: serverMethodsContent.split('\\n').find(line => line.includes('securityDashboardHandlers')) || null
-};
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".json"):
+                    try:
+                        entries.append((entry.stat().st_mtime_ns, entry.path))
+                    except FileNotFoundError:
+                        pass
+            if len(entries) > self.CACHE_MAX_ENTRIES:
+                entries.sort()
+                for _, path in entries[:len(entries) - self.CACHE_MAX_ENTRIES]:
+                    # Another run may have evicted it already; unlink's ENOENT is the check
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+        except OSError as e:
+            self.log(f"Could not cache Node result: {e}", "WARN")
 
-console.log(JSON.stringify(result));
-'''
-        
+    def _send_to_worker(self, payload: bytes) -> Dict[str, Any]:
         try:
-            result = self.run_node_test(test_code)
-            
-            if result.get("success"):
-                has_import = result.get("hasImport", False)
-                has_include = result.get("hasInclude", False)
-                
-                if has_import and has_include:
-                    self.tests_passed += 1
-                    self.log("✅ Server methods integration - PASSED")
-                    self.test_results["server_methods_integration"] = {
-                        "status": "PASSED",
-                        "details": "securityDashboardHandlers properly imported and included"
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("Server methods integration")
-                    self.log(f"❌ Server methods integration - FAILED: Import: {has_import}, Include: {has_include}")
-                    self.test_results["server_methods_integration"] = {
-                        "status": "FAILED",
-                        "error": f"Import: {has_import}, Include: {has_include}"
-                    }
-                    return False
-            else:
-                self.failed_tests.append("Server methods integration")
-                self.log(f"❌ Server methods integration - FAILED: {result.get('error', 'Unknown error')}")
-                self.test_results["server_methods_integration"] = {
-                    "status": "FAILED",
-                    "error": result.get('error', 'Unknown error')
-                }
-                return False
-                
+            if self._node_proc is None or self._node_proc.poll() is not None:
+                return {"success": False, "error": self._node_error or "Node worker is not running"}
+
+            self._node_seq += 1
+            # Splice the sequence id in front of the already-serialized request
+            self._node_proc.stdin.write(b'{"id":%d,' % self._node_seq + payload[1:] + b"\n")
+            self._node_proc.stdin.flush()
+
+            line = self._node_proc.stdout.readline()
+            if not line:
+                self._node_error = "Node worker exited unexpectedly"
+                return {"success": False, "error": self._node_error}
+
+            reply = json_loads(line)
+            if not reply.get("ok"):
+                return {"success": False, "error": reply.get("error", "Unknown error")}
+
+            result = reply.get("result")
+            return result if isinstance(result, dict) else {"success": True, "output": result}
+
         except Exception as e:
-            self.failed_tests.append("Server methods integration")
-            self.log(f"❌ Server methods integration - ERROR: {str(e)}")
-            self.test_results["server_methods_integration"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
+            return {"success": False, "error": str(e)}
     
-    def test_server_methods_list_integration(self):
-        """Test server-methods-list.ts includes all security methods"""
-        self.log("Testing server methods list integration...")
-        self.tests_run += 1
-        
-        test_code = '''
-import fs from 'fs';
+    def _run_all_export_checks(self) -> Dict[str, Any]:
+        """Describe every security module in one worker call and return a typeof map per module"""
+        with self._export_lock:
+            if self._export_checks is None:
+                self._export_checks = self._load_export_checks()
+            return self._export_checks
 
-const serverMethodsListContent = fs.readFileSync('/app/src/gateway/server-methods-list.ts', 'utf8');
+    def _load_export_checks(self) -> Dict[str, Any]:
+        result = self._worker_rpc({"cmd": "describe", "modules": self.EXPORT_MODULES},
+                                  memoize=True, deps=list(self.EXPORT_MODULES.values()))
+        if result.get("success"):
+            return result.get("modules", {})
+        error = result.get("error", "Unknown error")
+        return {name: {"success": False, "error": error} for name in self.EXPORT_MODULES}
 
-const expectedMethods = [
-    'security.dashboard',
-    'security.blocked.list',
-    'security.blocked.add',
-    'security.blocked.remove',
-    'security.incidents.list',
-    'security.gateway.connections',
-    'security.lockdown.toggle',
-    'security.lockdown.status'
-];
+    def _missing_functions(self, exports: Dict[str, str], expected: frozenset) -> List[str]:
+        return sorted(expected - {name for name, kind in exports.items() if kind == "function"})
 
-const result = {
-    success: true,
-    foundMethods: expectedMethods.filter(method => serverMethodsListContent.includes(`"${method}"`)),
-    missingMethods: expectedMethods.filter(method => !serverMethodsListContent.includes(`"${method}"`))
-};
+    def _verify_firewall_exports(self, exports: Dict[str, str]) -> Optional[str]:
+        missing_functions = self._missing_functions(exports, self.FIREWALL_EXPECTED)
+        if missing_functions or exports.get("FIREWALL_CONFIG") != "object":
+            return f"Missing functions: {missing_functions}"
+        return None
 
-console.log(JSON.stringify(result));
-'''
-        
-        try:
-            result = self.run_node_test(test_code)
-            
-            if result.get("success"):
-                found_methods = result.get("foundMethods", [])
-                missing_methods = result.get("missingMethods", [])
-                
-                if not missing_methods:
-                    self.tests_passed += 1
-                    self.log("✅ Server methods list integration - PASSED")
-                    self.test_results["server_methods_list_integration"] = {
-                        "status": "PASSED",
-                        "details": f"All security methods found: {found_methods}"
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("Server methods list integration")
-                    self.log(f"❌ Server methods list integration - FAILED: Missing methods: {missing_methods}")
-                    self.test_results["server_methods_list_integration"] = {
-                        "status": "FAILED",
-                        "error": f"Missing methods: {missing_methods}"
-                    }
-                    return False
-            else:
-                self.failed_tests.append("Server methods list integration")
-                self.log(f"❌ Server methods list integration - FAILED: {result.get('error', 'Unknown error')}")
-                self.test_results["server_methods_list_integration"] = {
-                    "status": "FAILED",
-                    "error": result.get('error', 'Unknown error')
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("Server methods list integration")
-            self.log(f"❌ Server methods list integration - ERROR: {str(e)}")
-            self.test_results["server_methods_list_integration"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
+    def _verify_gateway_exports(self, exports: Dict[str, str]) -> Optional[str]:
+        missing_functions = self._missing_functions(exports, self.GATEWAY_EXPECTED)
+        if missing_functions or exports.get("GATEWAY_SECURITY_CONFIG") != "object":
+            return f"Missing functions: {missing_functions}"
+        return None
+
+    def _verify_lockdown_exports(self, exports: Dict[str, str]) -> Optional[str]:
+        missing_functions = self._missing_functions(exports, self.LOCKDOWN_EXPECTED)
+        if missing_functions or exports.get("LOCKDOWN_CONFIG") != "object":
+            return f"Missing functions: {missing_functions}"
+        return None
+
+    def _verify_dashboard_exports(self, exports: Dict[str, str], handlers: List[str]) -> Optional[str]:
+        missing_handlers = sorted(self.SECURITY_METHODS.difference(handlers))
+        if exports.get("securityDashboardHandlers") != "object" or missing_handlers:
+            return f"Missing handlers: {missing_handlers}"
+        return None
+
+    def _module_exports_outcome(self, module: str):
+        """Check the batched export description for one module"""
+        result = self._run_all_export_checks().get(module, {"success": False, "error": "Module not checked"})
+        if not result.get("success"):
+            return False, result.get("error", "Unknown error")
+
+        exports = result.get("exports", {})
+        if module == "dashboard":
+            handlers = result.get("keys", {}).get("securityDashboardHandlers", [])
+            error = self._verify_dashboard_exports(exports, handlers)
+            details = f"All required handlers exported: {handlers}"
+        else:
+            error = getattr(self, f"_verify_{module}_exports")(exports)
+            details = "All required functions and config exported correctly"
+        return (True, details) if error is None else (False, error)
+
+    def _read_file(self, path: str) -> str:
+        """Read a repo file, reusing the cached text while its mtime is unchanged"""
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._file_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path, "rb") as f:
+            content = f.read().decode("utf-8")
+        self._file_cache[path] = (mtime, content)
+        return content
+
+    @check_case("firewall_exports", "Firewall module exports")
+    def test_firewall_module_exports(self):
+        """Test firewall.ts module exports all required functions"""
+        return self._module_exports_outcome("firewall")
+    
+    @check_case("gateway_protection_exports", "Gateway protection module exports")
+    def test_gateway_protection_module_exports(self):
+        """Test gateway-protection.ts module exports all required functions"""
+        return self._module_exports_outcome("gateway")
+    
+    @check_case("lockdown_mode_exports", "Lockdown mode module exports")
+    def test_lockdown_mode_module_exports(self):
+        """Test lockdown-mode.ts module exports all required functions"""
+        return self._module_exports_outcome("lockdown")
     
+    @check_case("dashboard_handlers_exports", "Dashboard handlers module exports")
+    def test_dashboard_handlers_module_exports(self):
+        """Test dashboard-handlers.ts module exports securityDashboardHandlers"""
+        return self._module_exports_outcome("dashboard")
+    
+    @check_case("server_methods_integration", "Server methods integration")
+    def test_server_methods_integration(self):
+        """Test server-methods.ts imports and includes securityDashboardHandlers"""
+        server_methods_content = self._read_file("/app/src/gateway/server-methods.ts")
+        has_import = "securityDashboardHandlers" in server_methods_content
+        has_include = "...securityDashboardHandlers" in server_methods_content
+        if has_import and has_include:
+            return True, "securityDashboardHandlers properly imported and included"
+        return False, f"Import: {has_import}, Include: {has_include}"
+    
+    @check_case("server_methods_list_integration", "Server methods list integration")
+    def test_server_methods_list_integration(self):
+        """Test server-methods-list.ts includes all security methods"""
+        server_methods_list_content = self._read_file("/app/src/gateway/server-methods-list.ts")
+        found_methods = sorted(set(self.SECURITY_METHODS_RE.findall(server_methods_list_content)))
+        missing_methods = sorted(self.SECURITY_METHODS.difference(found_methods))
+        if not missing_methods:
+            return True, f"All security methods found: {found_methods}"
+        return False, f"Missing methods: {missing_methods}"
+    
+    @check_case("env_example_security_vars", "Env.example security variables")
     def test_env_example_security_vars(self):
         """Test env.example contains all required security environment variables"""
-        self.log("Testing env.example security variables...")
-        self.tests_run += 1
-        
-        try:
-            with open("/app/env.example", "r") as f:
-                env_content = f.read()
-            
-            expected_vars = [
-                "SECURITY_FIREWALL", "SECURITY_STRICT_MODE", "MAX_PAYLOAD_SIZE_BYTES",
-                "RATE_LIMIT_API_PER_MINUTE", "RATE_LIMIT_LOGIN_PER_HOUR", "RATE_LIMIT_WS_PER_IP",
-                "AUTO_BLOCK_DURATION_MS", "MAX_FAILED_AUTH_ATTEMPTS", "GATEWAY_PASSWORD_REQUIRED",
-                "GATEWAY_PASSWORD", "GATEWAY_MAX_CONNECTIONS", "GATEWAY_CONNECTION_TIMEOUT_MS",
-                "SECURITY_LOCKDOWN", "SECURITY_ADMIN_EMAIL", "SECURITY_EMERGENCY",
-                "SECURITY_ADMIN_ONLY", "SECURITY_CHAT_DISABLED", "SECURITY_TOOLS_DISABLED",
-                "SECURITY_GATEWAY_RESTRICTED", "KILL_SWITCH", "KILL_SWITCH_CONFIRM_CODE"
-            ]
-            
-            found_vars = [var for var in expected_vars if var in env_content]
-            missing_vars = [var for var in expected_vars if var not in env_content]
-            
-            if not missing_vars:
-                self.tests_passed += 1
-                self.log("✅ Env.example security variables - PASSED")
-                self.test_results["env_example_security_vars"] = {
-                    "status": "PASSED",
-                    "details": f"All {len(found_vars)} security variables found"
-                }
-                return True
-            else:
-                self.failed_tests.append("Env.example security variables")
-                self.log(f"❌ Env.example security variables - FAILED: Missing variables: {missing_vars}")
-                self.test_results["env_example_security_vars"] = {
-                    "status": "FAILED",
-                    "error": f"Missing variables: {missing_vars}"
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("Env.example security variables")
-            self.log(f"❌ Env.example security variables - ERROR: {str(e)}")
-            self.test_results["env_example_security_vars"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
+        env_content = self._read_file("/app/env.example")
+        found_vars = set(self.ENV_EXPECTED_RE.findall(env_content))
+        missing_vars = sorted(self.ENV_EXPECTED - found_vars)
+        if not missing_vars:
+            return True, f"All {len(found_vars)} security variables found"
+        return False, f"Missing variables: {missing_vars}"
     
+    @check_case("deploy_coolify_security_docs", "DEPLOY_COOLIFY.md security documentation")
     def test_deploy_coolify_security_docs(self):
         """Test DEPLOY_COOLIFY.md contains Security Configuration section"""
-        self.log("Testing DEPLOY_COOLIFY.md security documentation...")
-        self.tests_run += 1
-        
-        try:
-            with open("/app/docs/DEPLOY_COOLIFY.md", "r") as f:
-                docs_content = f.read()
-            
-            required_sections = [
-                "Security Configuration",
-                "Basic Security Setup", 
-                "Gateway Protection",
-                "Lockdown Mode",
-                "Emergency Mode",
-                "Kill Switch",
-                "Security Dashboard"
-            ]
-            
-            found_sections = [section for section in required_sections if section in docs_content]
-            missing_sections = [section for section in required_sections if section not in docs_content]
-            
-            if not missing_sections:
-                self.tests_passed += 1
-                self.log("✅ DEPLOY_COOLIFY.md security documentation - PASSED")
-                self.test_results["deploy_coolify_security_docs"] = {
-                    "status": "PASSED",
-                    "details": f"All {len(found_sections)} security sections found"
-                }
-                return True
-            else:
-                self.failed_tests.append("DEPLOY_COOLIFY.md security documentation")
-                self.log(f"❌ DEPLOY_COOLIFY.md security documentation - FAILED: Missing sections: {missing_sections}")
-                self.test_results["deploy_coolify_security_docs"] = {
-                    "status": "FAILED",
-                    "error": f"Missing sections: {missing_sections}"
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("DEPLOY_COOLIFY.md security documentation")
-            self.log(f"❌ DEPLOY_COOLIFY.md security documentation - ERROR: {str(e)}")
-            self.test_results["deploy_coolify_security_docs"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
+        docs_content = self._read_file("/app/docs/DEPLOY_COOLIFY.md")
+        found_sections = set(self.DEPLOY_DOCS_SECTIONS_RE.findall(docs_content))
+        missing_sections = sorted(self.DEPLOY_DOCS_SECTIONS - found_sections)
+        if not missing_sections:
+            return True, f"All {len(found_sections)} security sections found"
+        return False, f"Missing sections: {missing_sections}"
     
+    @check_case("changelog_security_entry", "CHANGELOG.md security entry")
     def test_changelog_security_entry(self):
         """Test CHANGELOG.md contains 2026.1.28-fix.2 with Cybersecurity Defense System"""
-        self.log("Testing CHANGELOG.md security entry...")
-        self.tests_run += 1
-        
-        try:
-            with open("/app/CHANGELOG.md", "r") as f:
-                changelog_content = f.read()
-            
-            required_elements = [
-                "2026.1.28-fix.2",
-                "Cybersecurity Defense System",
-                "Request Firewall (Mini-WAF)",
-                "Rate Limiting",
-                "Gateway Protection",
-                "Lockdown Mode",
-                "Security Dashboard"
-            ]
-            
-            found_elements = [element for element in required_elements if element in changelog_content]
-            missing_elements = [element for element in required_elements if element not in changelog_content]
-            
-            if not missing_elements:
-                self.tests_passed += 1
-                self.log("✅ CHANGELOG.md security entry - PASSED")
-                self.test_results["changelog_security_entry"] = {
-                    "status": "PASSED",
-                    "details": f"All {len(found_elements)} security elements found"
-                }
-                return True
-            else:
-                self.failed_tests.append("CHANGELOG.md security entry")
-                self.log(f"❌ CHANGELOG.md security entry - FAILED: Missing elements: {missing_elements}")
-                self.test_results["changelog_security_entry"] = {
-                    "status": "FAILED",
-                    "error": f"Missing elements: {missing_elements}"
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("CHANGELOG.md security entry")
-            self.log(f"❌ CHANGELOG.md security entry - ERROR: {str(e)}")
-            self.test_results["changelog_security_entry"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
+        changelog_content = self._read_file("/app/CHANGELOG.md")
+        found_elements = set(self.CHANGELOG_ELEMENTS_RE.findall(changelog_content))
+        missing_elements = sorted(self.CHANGELOG_ELEMENTS - found_elements)
+        if not missing_elements:
+            return True, f"All {len(found_elements)} security elements found"
+        return False, f"Missing elements: {missing_elements}"
     
+    @check_case("firewall_functionality", "Firewall functionality")
     def test_firewall_functionality(self):
         """Test basic firewall functionality"""
-        self.log("Testing firewall functionality...")
-        self.tests_run += 1
-        
         test_code = '''
-import { 
+const { 
     isIpBlocked, 
     blockIp, 
     unblockIp, 
@@ -669,7 +588,7 @@ import {
     validateHeaders,
     validatePayloadSize,
     validateUrlLength
-} from '/app/dist/security/firewall.js';
+} = await load('/app/dist/security/firewall.js');
 
 // Test IP blocking
 const testIp = "192.168.1.100";
@@ -705,78 +624,62 @@ const result = {
     }
 };
 
-console.log(JSON.stringify(result));
+return result;
 '''
         
-        try:
-            result = self.run_node_test(test_code)
-            
-            if result.get("success"):
-                tests = result.get("tests", {})
-                failed_tests = [test for test, passed in tests.items() if not passed]
-                
-                if not failed_tests:
-                    self.tests_passed += 1
-                    self.log("✅ Firewall functionality - PASSED")
-                    self.test_results["firewall_functionality"] = {
-                        "status": "PASSED",
-                        "details": "IP blocking, attack detection, and validation working correctly"
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("Firewall functionality")
-                    self.log(f"❌ Firewall functionality - FAILED: Failed tests: {failed_tests}")
-                    self.test_results["firewall_functionality"] = {
-                        "status": "FAILED",
-                        "error": f"Failed tests: {failed_tests}"
-                    }
-                    return False
-            else:
-                self.failed_tests.append("Firewall functionality")
-                self.log(f"❌ Firewall functionality - FAILED: {result.get('error', 'Unknown error')}")
-                self.test_results["firewall_functionality"] = {
-                    "status": "FAILED",
-                    "error": result.get('error', 'Unknown error')
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("Firewall functionality")
-            self.log(f"❌ Firewall functionality - ERROR: {str(e)}")
-            self.test_results["firewall_functionality"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
+        result = self.run_node_test(test_code)
+        if not result.get("success"):
+            return False, result.get("error", "Unknown error")
+
+        failed_tests = [test for test, passed in result.get("tests", {}).items() if not passed]
+        if not failed_tests:
+            return True, "IP blocking, attack detection, and validation working correctly"
+        return False, f"Failed tests: {failed_tests}"
     
     def run_all_tests(self):
         """Run all cybersecurity defense tests"""
         self.log("🛡️  Starting Cybersecurity Defense System Test Suite")
         self.log("=" * 60)
         
-        # Test module exports
-        self.test_firewall_module_exports()
-        self.test_gateway_protection_module_exports()
-        self.test_lockdown_mode_module_exports()
-        self.test_dashboard_handlers_module_exports()
-        
-        # Test integration
-        self.test_server_methods_integration()
-        self.test_server_methods_list_integration()
-        
-        # Test documentation
-        self.test_env_example_security_vars()
-        self.test_deploy_coolify_security_docs()
-        self.test_changelog_security_entry()
+        tests = [
+            # Module exports
+            self.test_firewall_module_exports,
+            self.test_gateway_protection_module_exports,
+            self.test_lockdown_mode_module_exports,
+            self.test_dashboard_handlers_module_exports,
+            # Integration
+            self.test_server_methods_integration,
+            self.test_server_methods_list_integration,
+            # Documentation
+            self.test_env_example_security_vars,
+            self.test_deploy_coolify_security_docs,
+            self.test_changelog_security_entry,
+            # Functionality
+            self.test_firewall_functionality,
+        ]
         
-        # Test functionality
-        self.test_firewall_functionality()
+        # The tests are independent; Node calls still go through the one worker in turn
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            outcomes = list(pool.map(lambda test: test(), tests))
+
+        self.close()
+        self._aggregate(outcomes)
         
         # Print summary
         self.print_summary()
         
         return self.tests_passed == self.tests_run
     
+    def _aggregate(self, outcomes: List[CheckOutcome]):
+        """Fold the per-test outcomes into the suite counters and result map"""
+        self.tests_run = len(outcomes)
+        self.tests_passed = sum(o.ok for o in outcomes)
+        self.failed_tests = [o.label for o in outcomes if not o.ok]
+        self.test_results = {
+            o.key: CheckResult(o.status, details=o.detail) if o.ok else CheckResult(o.status, error=o.detail)
+            for o in outcomes
+        }
+    
     def print_summary(self):
         """Print test summary"""
         self.log("=" * 60)
@@ -818,8 +721,8 @@ console.log(JSON.stringify(result));
                 "detailed_results": self.test_results
             }
             
-            with open("/app/cybersecurity_defense_test_results.json", "w") as f:
-                json.dump(results, f, indent=2)
+            with open("/app/cybersecurity_defense_test_results.json", "wb") as f:
+                f.write(json_dumps_pretty(results))
                 
             self.log("📄 Detailed test results saved to /app/cybersecurity_defense_test_results.json")
             
@@ -828,7 +731,13 @@ console.log(JSON.stringify(result));
 
 def main():
     """Main test runner"""
-    suite = CybersecurityDefenseTestSuite()
+    parser = argparse.ArgumentParser(description="Run the cybersecurity defense test suite.")
+    parser.add_argument("--reuse-cache", action="store_true",
+                        help="reuse Node check results from an earlier run when nothing under dist/ "
+                             "has changed, instead of running them again")
+    args = parser.parse_args()
+
+    suite = CybersecurityDefenseTestSuite(reuse_cache=args.reuse_cache)
     success = suite.run_all_tests()
     
     return 0 if success else 1
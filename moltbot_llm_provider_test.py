@@ -5,60 +5,324 @@ Tests the new LLM provider reliability features including defaults, configuratio
 """
 
 import sys
+import argparse
+import functools
 import json
 import subprocess
 import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode("utf-8")
+
+
+def json_dumps_pretty(obj: Any) -> bytes:
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+def _read_text(path: str) -> str:
+    """Contents of a repo file; read again only after the file changes"""
+    return _read_text_at(path, os.stat(path).st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=None)
+def _read_text_at(path: str, mtime_ns: int) -> str:
+    with open(path, "r") as f:
+        return f.read()
+
+
+def _read_json(path: str) -> Any:
+    """Parsed contents of a repo JSON file; parsed again only after the file changes"""
+    return _read_json_at(path, os.stat(path).st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=None)
+def _read_json_at(path: str, mtime_ns: int) -> Any:
+    with open(path, "rb") as f:
+        return json_loads(f.read())
+
+
+# CommonJS dispatcher: reads one {"id", "code"} JSON line at a time, runs `code` as the body
+# of a function and answers with one {"id", "ok", "result"|"error"} line. Each distinct body
+# is compiled once and reused. console.log goes to stderr so it cannot corrupt the replies.
+# The app directory arrives as argv[1]: the worker changes into it itself and resolves
+# require() from there, so Python can spawn it without a cwd.
+NODE_WORKER_SCRIPT = """
+const readline = require('readline');
+const vm = require('vm');
+
+process.chdir(process.argv[1]);
+globalThis.require = require('module').createRequire(`${process.cwd()}/`);
+
+console.log = (...args) => console.error(...args);
+
+const scripts = new Map();
+const compile = (code) => {
+    let script = scripts.get(code);
+    if (!script) {
+        script = new vm.Script(`(() => {\n${code}\n})()`);
+        scripts.set(code, script);
+    }
+    return script;
+};
+
+const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+rl.on('line', (line) => {
+    if (!line) return;
+    const { id, code } = JSON.parse(line);
+    let reply;
+    try {
+        reply = { id, ok: true, result: compile(code).runInThisContext() };
+    } catch (error) {
+        reply = { id, ok: false, error: error.message };
+    }
+    process.stdout.write(JSON.stringify(reply) + '\\n');
+});
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def _names_regex(names: tuple) -> "re.Pattern[bytes]":
+    """One alternation over `names`, so a document is scanned once for all of them"""
+    return re.compile(b"|".join(re.escape(name) for name in sorted(names, key=len, reverse=True)))
+
+
+def _windows(path: str, overlap: int, chunk_size: int = 1 << 16):
+    """Yield a file in chunks, each prefixed with the last `overlap` bytes of the one before"""
+    with open(path, "rb") as f:
+        tail = b""
+        while chunk := f.read(chunk_size):
+            window = tail + chunk
+            yield window
+            tail = window[-overlap:] if overlap else b""
+
+
+def _missing_names(path: str, names: List[str]) -> List[str]:
+    """Names from `names` that do not occur anywhere in the file at `path`, in their original order"""
+    encoded = [name.encode("utf-8") for name in names]
+    # Overlap chunks by one byte less than the longest name so none is split unseen
+    overlap = max(map(len, encoded)) - 1
+    pattern = _names_regex(tuple(encoded))
+
+    found = set()
+    for window in _windows(path, overlap):
+        found.update(pattern.findall(window))
+
+    missing = [name for name in encoded if name not in found]
+    if missing:
+        # A match can swallow a name that overlaps it; recheck the few left over directly
+        for window in _windows(path, overlap):
+            missing = [name for name in missing if name not in window]
+    return [name.decode("utf-8") for name in missing]
+
+
+def _missing_names_in(source: str, names: List[str]) -> List[str]:
+    """Names from `names` that `source` never mentions, as an identifier or a quoted key"""
+    return [name for name in names
+            if not re.search(rf"(?<![\w$]){re.escape(name)}(?![\w$])", source)]
+
+
+_EXPORT_DECL_RE = re.compile(
+    r"\bexport\s+(?:default\s+)?(?:async\s+)?(?:function\*?|const|let|var|class)\s+([\w$]+)"
+    r"|\bexports\.([\w$]+)\s*="
+)
+_EXPORT_LIST_RE = re.compile(r"\bexport\s*\{([^}]*)\}")
+
+
+def _exported_names(source: str) -> set:
+    """Names a compiled ESM or CommonJS module exports, found by scanning its text"""
+    names = {decl or cjs for decl, cjs in _EXPORT_DECL_RE.findall(source)}
+    for export_list in _EXPORT_LIST_RE.findall(source):
+        for item in export_list.split(","):
+            # `local as exported` exports the right-hand name
+            name = item.strip().split(" as ")[-1].strip()
+            if name:
+                names.add(name)
+    return names
+
+
+class NodeWorker:
+    """Long-lived node process that runs check scripts for the whole suite.
+
+    `prelude` is evaluated once at startup, after the worker has moved into `cwd` and before
+    any request is handled, so later requests can call whatever it defines instead of resending it.
+    """
+
+    def __init__(self, cwd: str, prelude: str = "", env: Optional[Dict[str, str]] = None):
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._stderr = tempfile.TemporaryFile()
+        # An absolute executable, no cwd and close_fds=False let CPython start node with
+        # posix_spawn rather than fork+exec, which skips copying this process's page tables
+        self.proc = subprocess.Popen(
+            [shutil.which("node") or "node", "-e", NODE_WORKER_SCRIPT + prelude, cwd],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+            close_fds=False,
+            env=env
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def call(self, code: str) -> Dict[str, Any]:
+        """Run `code` in the worker and return its {ok, result|error} reply"""
+        with self._lock:
+            self._seq += 1
+            request_id = self._seq
+            try:
+                self.proc.stdin.write(json_dumps({"id": request_id, "code": code}) + b"\n")
+                self.proc.stdin.flush()
+                line = self.proc.stdout.readline()
+            except OSError:
+                line = b""
+        if not line:
+            return {"ok": False, "error": f"Node worker exited: {self._stderr_tail()}"}
+        reply = json_loads(line)
+        if reply.get("id") != request_id:
+            return {"ok": False, "error": f"Node worker answered request {reply.get('id')}, expected {request_id}"}
+        return reply
+
+    def _stderr_tail(self) -> str:
+        self.proc.wait(timeout=5)
+        self._stderr.seek(0)
+        return self._stderr.read()[-2000:].decode("utf-8", "replace").strip()
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=10)
+        except Exception:
+            self.proc.kill()
+        self._stderr.close()
+
+
 class MoltBotLLMProviderTestSuite:
-    def __init__(self):
+    NODE_COMPILE_CACHE_DIR = "/tmp/.moltbot_test_node_cache"
+
+    def __init__(self, fast: bool = False):
+        # fast: answer the Node-side checks by scanning the built JS instead of loading it
+        self.fast = fast
+        self._last_ts_sec = -1
+        self._last_ts_str = ""
         self.tests_run = 0
         self.tests_passed = 0
         self.failed_tests = []
         self.test_results = {}
         self.app_dir = "/app"
+        os.makedirs(self.NODE_COMPILE_CACHE_DIR, exist_ok=True)
+        self.batch_results = {}
+        # Tests run on a thread pool; _lock keeps their log lines and the timestamp cache whole
+        self._lock = threading.Lock()
+        self.worker = None
+        self._worker_lock = threading.Lock()
+        # (result key, label, check) in run order; each check returns (ok, payload)
+        self._specs = [
+            ("defaults_exports", "defaults.ts exports", self._check_defaults_exports),
+            ("llm_config_exports", "llm-config.ts exports", self._check_llm_config_exports),
+            ("providers_handlers", "providers.ts handlers", self._check_providers_handlers),
+            ("server_methods_integration", "server-methods.ts integration", self._check_server_methods_integration),
+            ("server_methods_list", "server-methods-list.ts", self._check_server_methods_list),
+            ("timeout_imports", "timeout.ts imports", self._check_timeout_imports),
+            ("moltbot_json_validity", "docker/moltbot.json validity", self._check_moltbot_json_validity),
+            ("deploy_coolify_docs", "docs/DEPLOY_COOLIFY.md", self._check_deploy_coolify_docs),
+            ("env_example", "env.example", self._check_env_example),
+        ]
         
     def log(self, message: str, level: str = "INFO"):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {level}: {message}")
+        with self._lock:
+            # Reformat the timestamp only when the wall-clock second changes
+            now = int(time.time())
+            if now != self._last_ts_sec:
+                self._last_ts_str = time.strftime("%H:%M:%S", time.localtime(now))
+                self._last_ts_sec = now
+            print(f"[{self._last_ts_str}] {level}: {message}")
         
     def run_node_command(self, command: str) -> Dict[str, Any]:
-        """Run a Node.js command and return results"""
+        """Run a Node.js function body on the suite's worker and return its result"""
         try:
-            result = subprocess.run(
-                ["node", "-e", command], 
-                capture_output=True, 
-                text=True, 
-                cwd=self.app_dir
-            )
-            
-            if result.returncode == 0:
-                return {"success": True, "output": result.stdout.strip()}
+            with self._worker_lock:
+                if self.worker is None:
+                    self.worker = NodeWorker(
+                        self.app_dir,
+                        self._build_combined_node_script(),
+                        # Node 22.1+ keeps compiled module bytecode here across runs; older versions ignore it
+                        env={**os.environ, "NODE_COMPILE_CACHE": self.NODE_COMPILE_CACHE_DIR}
+                    )
+            reply = self.worker.call(command)
+
+            if reply.get("ok"):
+                return {"success": True, "result": reply.get("result")}
             else:
-                return {"success": False, "error": result.stderr.strip(), "output": result.stdout.strip()}
-                
+                return {"success": False, "error": reply.get("error")}
+
         except Exception as e:
             return {"success": False, "error": str(e)}
+
+    def close(self):
+        """Shut down the Node worker"""
+        with self._worker_lock:
+            if self.worker is not None:
+                self.worker.close()
+                self.worker = None
     
-    def test_defaults_exports(self):
-        """Test that defaults.ts exports the required constants"""
-        self.log("Testing defaults.ts exports...")
-        self.tests_run += 1
-        
-        test_code = """
-        try {
-            const defaults = require('./dist/agents/defaults.js');
-            
+    PROVIDER_METHODS = ["providers.status", "providers.test"]
+
+    # Checks answered from the gateway_handlers probe: (probe side, error prefix, details)
+    HANDLER_CHECKS = {
+        "providers_handlers": ("providers", "Missing handler methods", "All required handler methods found"),
+        "server_methods_integration": (
+            "core", "Missing methods in coreGatewayHandlers", "Provider methods integrated into coreGatewayHandlers"
+        ),
+    }
+
+    # Built modules the Node checks use, by the name they load() them under
+    NODE_MODULES = {
+        "defaults": "./dist/agents/defaults.js",
+        "llmConfig": "./dist/agents/llm-config.js",
+        "providers": "./dist/gateway/server-methods/providers.js",
+        "serverMethods": "./dist/gateway/server-methods.js",
+        "timeout": "./dist/agents/timeout.js",
+    }
+
+    # Node-side checks keyed by result key. Each body runs inside a function and
+    # returns the verdict object the matching test_* method consumes.
+    NODE_CHECKS = {
+        "defaults_exports": """
+            const defaults = load('defaults');
+
             const requiredExports = [
                 'DEFAULT_LLM_TIMEOUT_MS',
-                'DEFAULT_LLM_STREAMING', 
+                'DEFAULT_LLM_STREAMING',
                 'DEFAULT_PROVIDER'
             ];
-            
+
             const missing = [];
             const values = {};
-            
+
             for (const exportName of requiredExports) {
                 if (defaults[exportName] === undefined) {
                     missing.push(exportName);
@@ -66,84 +330,24 @@ class MoltBotLLMProviderTestSuite:
                     values[exportName] = defaults[exportName];
                 }
             }
-            
+
             if (missing.length > 0) {
-                console.log(JSON.stringify({
-                    success: false,
-                    error: `Missing exports: ${missing.join(', ')}`
-                }));
-            } else {
-                console.log(JSON.stringify({
-                    success: true,
-                    exports: values
-                }));
+                return { success: false, error: `Missing exports: ${missing.join(', ')}` };
             }
-        } catch (error) {
-            console.log(JSON.stringify({
-                success: false,
-                error: error.message
-            }));
-        }
-        """
-        
-        try:
-            result = self.run_node_command(test_code)
-            
-            if result.get("success"):
-                output_data = json.loads(result["output"])
-                if output_data.get("success"):
-                    self.tests_passed += 1
-                    self.log("✅ defaults.ts exports - PASSED")
-                    self.test_results["defaults_exports"] = {
-                        "status": "PASSED",
-                        "exports": output_data.get("exports", {}),
-                        "details": "All required exports found"
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("defaults.ts exports")
-                    self.log(f"❌ defaults.ts exports - FAILED: {output_data.get('error')}")
-                    self.test_results["defaults_exports"] = {
-                        "status": "FAILED",
-                        "error": output_data.get("error")
-                    }
-                    return False
-            else:
-                self.failed_tests.append("defaults.ts exports")
-                self.log(f"❌ defaults.ts exports - FAILED: {result.get('error')}")
-                self.test_results["defaults_exports"] = {
-                    "status": "FAILED",
-                    "error": result.get("error")
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("defaults.ts exports")
-            self.log(f"❌ defaults.ts exports - ERROR: {str(e)}")
-            self.test_results["defaults_exports"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_llm_config_exports(self):
-        """Test that llm-config.ts exports the required functions"""
-        self.log("Testing llm-config.ts exports...")
-        self.tests_run += 1
-        
-        test_code = """
-        try {
-            const llmConfig = require('./dist/agents/llm-config.js');
-            
+            return { success: true, exports: values };
+        """,
+        "llm_config_exports": """
+            const llmConfig = load('llmConfig');
+
             const requiredExports = [
                 'getLLMConfig',
                 'isProviderConfigured',
                 'formatProviderError'
             ];
-            
+
             const missing = [];
             const types = {};
-            
+
             for (const exportName of requiredExports) {
                 if (llmConfig[exportName] === undefined) {
                     missing.push(exportName);
@@ -151,597 +355,333 @@ class MoltBotLLMProviderTestSuite:
                     types[exportName] = typeof llmConfig[exportName];
                 }
             }
-            
+
             if (missing.length > 0) {
-                console.log(JSON.stringify({
-                    success: false,
-                    error: `Missing exports: ${missing.join(', ')}`
-                }));
-            } else {
-                // Test function calls
-                const config = llmConfig.getLLMConfig();
-                const isConfigured = llmConfig.isProviderConfigured('groq');
-                const errorMsg = llmConfig.formatProviderError({
-                    provider: 'test',
-                    status: 401,
-                    message: 'Test error'
-                });
-                
-                console.log(JSON.stringify({
-                    success: true,
-                    exports: types,
-                    testResults: {
-                        getLLMConfig: typeof config === 'object' && config.hasOwnProperty('providers'),
-                        isProviderConfigured: typeof isConfigured === 'boolean',
-                        formatProviderError: typeof errorMsg === 'string' && errorMsg.includes('Test')
-                    }
-                }));
+                return { success: false, error: `Missing exports: ${missing.join(', ')}` };
             }
-        } catch (error) {
-            console.log(JSON.stringify({
-                success: false,
-                error: error.message
-            }));
-        }
-        """
-        
-        try:
-            result = self.run_node_command(test_code)
-            
-            if result.get("success"):
-                output_data = json.loads(result["output"])
-                if output_data.get("success"):
-                    self.tests_passed += 1
-                    self.log("✅ llm-config.ts exports - PASSED")
-                    self.test_results["llm_config_exports"] = {
-                        "status": "PASSED",
-                        "exports": output_data.get("exports", {}),
-                        "testResults": output_data.get("testResults", {}),
-                        "details": "All required functions exported and working"
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("llm-config.ts exports")
-                    self.log(f"❌ llm-config.ts exports - FAILED: {output_data.get('error')}")
-                    self.test_results["llm_config_exports"] = {
-                        "status": "FAILED",
-                        "error": output_data.get("error")
-                    }
-                    return False
-            else:
-                self.failed_tests.append("llm-config.ts exports")
-                self.log(f"❌ llm-config.ts exports - FAILED: {result.get('error')}")
-                self.test_results["llm_config_exports"] = {
-                    "status": "FAILED",
-                    "error": result.get("error")
+
+            // Test function calls
+            const config = llmConfig.getLLMConfig();
+            const isConfigured = llmConfig.isProviderConfigured('groq');
+            const errorMsg = llmConfig.formatProviderError({
+                provider: 'test',
+                status: 401,
+                message: 'Test error'
+            });
+
+            return {
+                success: true,
+                exports: types,
+                testResults: {
+                    getLLMConfig: typeof config === 'object' && config.hasOwnProperty('providers'),
+                    isProviderConfigured: typeof isConfigured === 'boolean',
+                    formatProviderError: typeof errorMsg === 'string' && errorMsg.includes('Test')
                 }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("llm-config.ts exports")
-            self.log(f"❌ llm-config.ts exports - ERROR: {str(e)}")
-            self.test_results["llm_config_exports"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_providers_handlers(self):
-        """Test that providers.ts exports providersHandlers with required methods"""
-        self.log("Testing providers.ts handlers...")
-        self.tests_run += 1
-        
-        test_code = """
-        try {
-            const providers = require('./dist/gateway/server-methods/providers.js');
-            
-            if (!providers.providersHandlers) {
-                console.log(JSON.stringify({
-                    success: false,
-                    error: 'providersHandlers not exported'
-                }));
-            } else {
-                const handlers = providers.providersHandlers;
-                const requiredMethods = ['providers.status', 'providers.test'];
-                const missing = [];
-                
-                for (const method of requiredMethods) {
-                    if (typeof handlers[method] !== 'function') {
-                        missing.push(method);
+            };
+        """,
+        "gateway_handlers": """
+            // One probe serves both handler-map checks; Python derives each verdict from it
+            const describe = (moduleName, exportName) => {
+                try {
+                    const handlers = load(moduleName)[exportName];
+                    if (!handlers) {
+                        return { error: `${exportName} not exported` };
                     }
+                    const keys = Object.keys(handlers);
+                    return { keys, functions: keys.filter((key) => typeof handlers[key] === 'function') };
+                } catch (error) {
+                    return { error: error.message };
                 }
-                
-                if (missing.length > 0) {
-                    console.log(JSON.stringify({
-                        success: false,
-                        error: `Missing handler methods: ${missing.join(', ')}`
-                    }));
-                } else {
-                    console.log(JSON.stringify({
-                        success: true,
-                        methods: Object.keys(handlers),
-                        details: 'All required handler methods found'
-                    }));
-                }
-            }
-        } catch (error) {
-            console.log(JSON.stringify({
-                success: false,
-                error: error.message
-            }));
-        }
-        """
-        
+            };
+
+            return {
+                success: true,
+                providers: describe('providers', 'providersHandlers'),
+                core: describe('serverMethods', 'coreGatewayHandlers')
+            };
+        """,
+        "timeout_imports": """
+            // The source-level import check runs in Python; this only proves the built module loads
+            load('timeout');
+            return {
+                success: true,
+                details: 'DEFAULT_LLM_TIMEOUT_MS imported and timeout module loads correctly'
+            };
+        """,
+    }
+
+    # Fast mode: (built module, names it must export, names it must mention, error prefix) per Node check
+    STATIC_CHECKS = {
+        "defaults_exports": (
+            "dist/agents/defaults.js",
+            ["DEFAULT_LLM_TIMEOUT_MS", "DEFAULT_LLM_STREAMING", "DEFAULT_PROVIDER"], [],
+            "Missing exports",
+        ),
+        "llm_config_exports": (
+            "dist/agents/llm-config.js",
+            ["getLLMConfig", "isProviderConfigured", "formatProviderError"], [],
+            "Missing exports",
+        ),
+        "providers_handlers": (
+            "dist/gateway/server-methods/providers.js",
+            ["providersHandlers"], ["providers.status", "providers.test"],
+            "Missing handler methods",
+        ),
+        "server_methods_integration": (
+            "dist/gateway/server-methods.js",
+            ["coreGatewayHandlers"], ["providersHandlers"],
+            "Missing methods in coreGatewayHandlers",
+        ),
+        "timeout_imports": ("dist/agents/timeout.js", [], [], ""),
+    }
+
+    def _build_combined_node_script(self) -> str:
+        """Worker prelude that loads NODE_MODULES and defines every NODE_CHECKS body once, run by key
+        through runChecks([...])"""
+        checks = ",\n".join(
+            f"{json.dumps(key)}: () => {{{code}}}" for key, code in self.NODE_CHECKS.items()
+        )
+        return (
+            # Every module is required once at startup; load() hands back its exports, or rethrows
+            # the error it failed with so only the checks that need it fail
+            f"const NODE_MODULES = {json.dumps(self.NODE_MODULES)};\n"
+            "const loaded = {};\n"
+            "for (const [name, path] of Object.entries(NODE_MODULES)) {\n"
+            "    try {\n"
+            "        loaded[name] = { exports: require(path) };\n"
+            "    } catch (error) {\n"
+            "        loaded[name] = { error };\n"
+            "    }\n"
+            "}\n"
+            "const load = (name) => {\n"
+            "    const entry = loaded[name];\n"
+            "    if (entry.error) throw entry.error;\n"
+            "    return entry.exports;\n"
+            "};\n"
+            "const checks = {\n" + checks + "\n};\n"
+            "globalThis.runChecks = (keys) => {\n"
+            "    const results = {};\n"
+            "    for (const key of keys) {\n"
+            "        try {\n"
+            "            results[key] = checks[key]();\n"
+            "        } catch (error) {\n"
+            "            results[key] = { success: false, error: error.message };\n"
+            "        }\n"
+            "    }\n"
+            "    return results;\n"
+            "};\n"
+        )
+
+    def run_node_checks(self, keys: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Run NODE_CHECKS in one worker call and return the verdict for each key"""
+        keys = list(self.NODE_CHECKS) if keys is None else keys
+        # The check bodies already live in the worker; the request only names them
+        result = self.run_node_command(f"return runChecks({json.dumps(keys)});")
+        if not result.get("success"):
+            return {key: {"success": False, "error": result.get("error")} for key in keys}
+        return result["result"]
+
+    def verdict(self, key: str) -> Dict[str, Any]:
+        """{success, error?, ...} for a Node-side check: a static scan in fast mode, else from the worker"""
+        if self.fast:
+            return self.static_result(key)
+        if key in self.HANDLER_CHECKS:
+            return self._handlers_verdict(key)
+        return self.node_result(key)
+
+    def _handlers_verdict(self, key: str) -> Dict[str, Any]:
+        """Verdict for one handler-map check, taken from the shared gateway_handlers probe"""
+        side, error_prefix, details = self.HANDLER_CHECKS[key]
+        probe = self.node_result("gateway_handlers")
+        if not probe.get("success"):
+            return probe
+
+        handlers = probe[side]
+        if "error" in handlers:
+            return {"success": False, "error": handlers["error"]}
+
+        functions = set(handlers["functions"])
+        missing = [method for method in self.PROVIDER_METHODS if method not in functions]
+        if missing:
+            return {"success": False, "error": f"{error_prefix}: {', '.join(missing)}"}
+        return {"success": True, "methods": handlers["keys"], "details": details}
+
+    def node_result(self, key: str) -> Dict[str, Any]:
+        """Verdict for one Node check, from the batched run when available"""
+        if key in self.batch_results:
+            return self.batch_results[key]
+        return self.run_node_checks([key])[key]
+
+    def _run(self, spec):
+        """Run one (key, label, check) spec and log it; returns (key, label, passed, result)"""
+        key, label, check = spec
+        self.log(f"Testing {label}...")
+
         try:
-            result = self.run_node_command(test_code)
-            
-            if result.get("success"):
-                output_data = json.loads(result["output"])
-                if output_data.get("success"):
-                    self.tests_passed += 1
-                    self.log("✅ providers.ts handlers - PASSED")
-                    self.test_results["providers_handlers"] = {
-                        "status": "PASSED",
-                        "methods": output_data.get("methods", []),
-                        "details": output_data.get("details")
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("providers.ts handlers")
-                    self.log(f"❌ providers.ts handlers - FAILED: {output_data.get('error')}")
-                    self.test_results["providers_handlers"] = {
-                        "status": "FAILED",
-                        "error": output_data.get("error")
-                    }
-                    return False
-            else:
-                self.failed_tests.append("providers.ts handlers")
-                self.log(f"❌ providers.ts handlers - FAILED: {result.get('error')}")
-                self.test_results["providers_handlers"] = {
-                    "status": "FAILED",
-                    "error": result.get("error")
-                }
-                return False
-                
+            passed, payload = check()
+            status = "PASSED" if passed else "FAILED"
         except Exception as e:
-            self.failed_tests.append("providers.ts handlers")
-            self.log(f"❌ providers.ts handlers - ERROR: {str(e)}")
-            self.test_results["providers_handlers"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_server_methods_integration(self):
-        """Test that server-methods.ts includes providersHandlers"""
-        self.log("Testing server-methods.ts integration...")
-        self.tests_run += 1
-        
-        test_code = """
-        try {
-            const serverMethods = require('./dist/gateway/server-methods.js');
-            
-            if (!serverMethods.coreGatewayHandlers) {
-                console.log(JSON.stringify({
-                    success: false,
-                    error: 'coreGatewayHandlers not exported'
-                }));
-            } else {
-                const handlers = serverMethods.coreGatewayHandlers;
-                const requiredMethods = ['providers.status', 'providers.test'];
-                const missing = [];
-                
-                for (const method of requiredMethods) {
-                    if (typeof handlers[method] !== 'function') {
-                        missing.push(method);
-                    }
-                }
-                
-                if (missing.length > 0) {
-                    console.log(JSON.stringify({
-                        success: false,
-                        error: `Missing methods in coreGatewayHandlers: ${missing.join(', ')}`
-                    }));
-                } else {
-                    console.log(JSON.stringify({
-                        success: true,
-                        details: 'Provider methods integrated into coreGatewayHandlers'
-                    }));
-                }
-            }
-        } catch (error) {
-            console.log(JSON.stringify({
-                success: false,
-                error: error.message
-            }));
-        }
-        """
-        
-        try:
-            result = self.run_node_command(test_code)
-            
-            if result.get("success"):
-                output_data = json.loads(result["output"])
-                if output_data.get("success"):
-                    self.tests_passed += 1
-                    self.log("✅ server-methods.ts integration - PASSED")
-                    self.test_results["server_methods_integration"] = {
-                        "status": "PASSED",
-                        "details": output_data.get("details")
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("server-methods.ts integration")
-                    self.log(f"❌ server-methods.ts integration - FAILED: {output_data.get('error')}")
-                    self.test_results["server_methods_integration"] = {
-                        "status": "FAILED",
-                        "error": output_data.get("error")
-                    }
-                    return False
+            passed, status, payload = False, "ERROR", {"error": str(e)}
+
+        if passed:
+            self.log(f"✅ {label} - PASSED")
+        else:
+            self.log(f"❌ {label} - {status}: {payload.get('error')}")
+        return key, label, passed, {"status": status, **payload}
+
+    def _aggregate(self, outcomes):
+        """Count and store _run outcomes in spec order, so results do not depend on thread timing"""
+        for key, label, passed, result in outcomes:
+            self.tests_run += 1
+            if passed:
+                self.tests_passed += 1
             else:
-                self.failed_tests.append("server-methods.ts integration")
-                self.log(f"❌ server-methods.ts integration - FAILED: {result.get('error')}")
-                self.test_results["server_methods_integration"] = {
-                    "status": "FAILED",
-                    "error": result.get("error")
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("server-methods.ts integration")
-            self.log(f"❌ server-methods.ts integration - ERROR: {str(e)}")
-            self.test_results["server_methods_integration"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_server_methods_list(self):
-        """Test that server-methods-list.ts includes provider methods in BASE_METHODS"""
-        self.log("Testing server-methods-list.ts...")
-        self.tests_run += 1
-        
-        test_code = """
-        try {
-            const fs = require('fs');
-            const content = fs.readFileSync('./src/gateway/server-methods-list.ts', 'utf8');
-            
-            const requiredMethods = ['providers.status', 'providers.test'];
-            const missing = [];
-            
-            for (const method of requiredMethods) {
-                if (!content.includes(`"${method}"`)) {
-                    missing.push(method);
-                }
-            }
-            
-            if (missing.length > 0) {
-                console.log(JSON.stringify({
-                    success: false,
-                    error: `Missing methods in BASE_METHODS: ${missing.join(', ')}`
-                }));
-            } else {
-                console.log(JSON.stringify({
-                    success: true,
-                    details: 'Provider methods found in BASE_METHODS'
-                }));
-            }
-        } catch (error) {
-            console.log(JSON.stringify({
-                success: false,
-                error: error.message
-            }));
-        }
-        """
-        
+                self.failed_tests.append(label)
+            self.test_results[key] = result
+
+    def static_result(self, key: str) -> Dict[str, Any]:
+        """Fast-mode stand-in for node_result(): the same verdict shape, from the built JS text"""
+        module_path, exports, mentions, error_prefix = self.STATIC_CHECKS[key]
         try:
-            result = self.run_node_command(test_code)
-            
-            if result.get("success"):
-                output_data = json.loads(result["output"])
-                if output_data.get("success"):
-                    self.tests_passed += 1
-                    self.log("✅ server-methods-list.ts - PASSED")
-                    self.test_results["server_methods_list"] = {
-                        "status": "PASSED",
-                        "details": output_data.get("details")
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("server-methods-list.ts")
-                    self.log(f"❌ server-methods-list.ts - FAILED: {output_data.get('error')}")
-                    self.test_results["server_methods_list"] = {
-                        "status": "FAILED",
-                        "error": output_data.get("error")
-                    }
-                    return False
-            else:
-                self.failed_tests.append("server-methods-list.ts")
-                self.log(f"❌ server-methods-list.ts - FAILED: {result.get('error')}")
-                self.test_results["server_methods_list"] = {
-                    "status": "FAILED",
-                    "error": result.get("error")
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("server-methods-list.ts")
-            self.log(f"❌ server-methods-list.ts - ERROR: {str(e)}")
-            self.test_results["server_methods_list"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_timeout_imports(self):
-        """Test that timeout.ts imports DEFAULT_LLM_TIMEOUT_MS from defaults"""
-        self.log("Testing timeout.ts imports...")
-        self.tests_run += 1
-        
-        test_code = """
-        try {
-            const fs = require('fs');
-            const content = fs.readFileSync('./src/agents/timeout.ts', 'utf8');
-            
-            const hasImport = content.includes('DEFAULT_LLM_TIMEOUT_MS') && 
-                             content.includes('from "./defaults.js"');
-            
-            if (!hasImport) {
-                console.log(JSON.stringify({
-                    success: false,
-                    error: 'DEFAULT_LLM_TIMEOUT_MS import from defaults.js not found'
-                }));
-            } else {
-                // Test that the import actually works
-                const timeout = require('./dist/agents/timeout.js');
-                console.log(JSON.stringify({
-                    success: true,
-                    details: 'DEFAULT_LLM_TIMEOUT_MS imported and timeout module loads correctly'
-                }));
-            }
-        } catch (error) {
-            console.log(JSON.stringify({
-                success: false,
-                error: error.message
-            }));
-        }
-        """
-        
+            source = _read_text(os.path.join(self.app_dir, module_path))
+        except OSError as e:
+            return {"success": False, "error": str(e)}
+
+        exported = _exported_names(source)
+        missing = [name for name in exports if name not in exported]
+        missing += _missing_names_in(source, mentions)
+        if missing:
+            return {"success": False, "error": f"{error_prefix}: {', '.join(missing)}"}
+        return {"success": True, "details": "Found by static scan of the built module (--fast)"}
+
+    def _node_check(self, key: str, details: Optional[str] = None, fields=()):
+        """(ok, payload) from the Node-side verdict for `key`, copying `fields` onto a pass"""
+        output_data = self.verdict(key)
+        if not output_data.get("success"):
+            return False, {"error": output_data.get("error")}
+
+        payload = {field: output_data.get(field, default) for field, default in fields}
+        payload["details"] = details or output_data.get("details")
+        return True, payload
+
+    def _check_defaults_exports(self):
+        """defaults.ts exports the required constants"""
+        return self._node_check("defaults_exports", "All required exports found", [("exports", {})])
+
+    def _check_llm_config_exports(self):
+        """llm-config.ts exports the required functions"""
+        return self._node_check("llm_config_exports", "All required functions exported and working",
+                                [("exports", {}), ("testResults", {})])
+
+    def _check_providers_handlers(self):
+        """providers.ts exports providersHandlers with required methods"""
+        return self._node_check("providers_handlers", fields=[("methods", [])])
+
+    def _check_server_methods_integration(self):
+        """server-methods.ts includes providersHandlers"""
+        return self._node_check("server_methods_integration")
+
+    def _check_server_methods_list(self):
+        """server-methods-list.ts includes provider methods in BASE_METHODS"""
         try:
-            result = self.run_node_command(test_code)
-            
-            if result.get("success"):
-                output_data = json.loads(result["output"])
-                if output_data.get("success"):
-                    self.tests_passed += 1
-                    self.log("✅ timeout.ts imports - PASSED")
-                    self.test_results["timeout_imports"] = {
-                        "status": "PASSED",
-                        "details": output_data.get("details")
-                    }
-                    return True
-                else:
-                    self.failed_tests.append("timeout.ts imports")
-                    self.log(f"❌ timeout.ts imports - FAILED: {output_data.get('error')}")
-                    self.test_results["timeout_imports"] = {
-                        "status": "FAILED",
-                        "error": output_data.get("error")
-                    }
-                    return False
-            else:
-                self.failed_tests.append("timeout.ts imports")
-                self.log(f"❌ timeout.ts imports - FAILED: {result.get('error')}")
-                self.test_results["timeout_imports"] = {
-                    "status": "FAILED",
-                    "error": result.get("error")
-                }
-                return False
-                
-        except Exception as e:
-            self.failed_tests.append("timeout.ts imports")
-            self.log(f"❌ timeout.ts imports - ERROR: {str(e)}")
-            self.test_results["timeout_imports"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_moltbot_json_validity(self):
-        """Test that docker/moltbot.json is valid JSON with provider configs"""
-        self.log("Testing docker/moltbot.json validity...")
-        self.tests_run += 1
-        
+            content = _read_text(os.path.join(self.app_dir, "src/gateway/server-methods-list.ts"))
+        except OSError as e:
+            return False, {"error": str(e)}
+
+        missing = [method for method in self.PROVIDER_METHODS if f'"{method}"' not in content]
+
+        if missing:
+            return False, {"error": f"Missing methods in BASE_METHODS: {', '.join(missing)}"}
+        return True, {"details": "Provider methods found in BASE_METHODS"}
+
+    def _check_timeout_imports(self):
+        """timeout.ts imports DEFAULT_LLM_TIMEOUT_MS from defaults"""
         try:
-            with open(os.path.join(self.app_dir, "docker/moltbot.json"), "r") as f:
-                config = json.load(f)
-            
-            # Check for required provider configurations
-            required_providers = ["groq", "openrouter", "ollama"]
-            missing_providers = []
-            
-            providers = config.get("models", {}).get("providers", {})
-            
-            for provider in required_providers:
-                if provider not in providers:
-                    missing_providers.append(provider)
-            
-            if missing_providers:
-                self.failed_tests.append("docker/moltbot.json validity")
-                self.log(f"❌ docker/moltbot.json validity - FAILED: Missing providers: {', '.join(missing_providers)}")
-                self.test_results["moltbot_json_validity"] = {
-                    "status": "FAILED",
-                    "error": f"Missing providers: {', '.join(missing_providers)}"
-                }
-                return False
-            else:
-                self.tests_passed += 1
-                self.log("✅ docker/moltbot.json validity - PASSED")
-                self.test_results["moltbot_json_validity"] = {
-                    "status": "PASSED",
-                    "providers": list(providers.keys()),
-                    "details": "Valid JSON with all required provider configurations"
-                }
-                return True
-                
-        except json.JSONDecodeError as e:
-            self.failed_tests.append("docker/moltbot.json validity")
-            self.log(f"❌ docker/moltbot.json validity - FAILED: Invalid JSON: {str(e)}")
-            self.test_results["moltbot_json_validity"] = {
-                "status": "FAILED",
-                "error": f"Invalid JSON: {str(e)}"
-            }
-            return False
-        except Exception as e:
-            self.failed_tests.append("docker/moltbot.json validity")
-            self.log(f"❌ docker/moltbot.json validity - ERROR: {str(e)}")
-            self.test_results["moltbot_json_validity"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_deploy_coolify_docs(self):
-        """Test that docs/DEPLOY_COOLIFY.md exists and documents env vars"""
-        self.log("Testing docs/DEPLOY_COOLIFY.md...")
-        self.tests_run += 1
-        
+            content = _read_text(os.path.join(self.app_dir, "src/agents/timeout.ts"))
+        except OSError as e:
+            return False, {"error": str(e)}
+
+        has_import = 'DEFAULT_LLM_TIMEOUT_MS' in content and 'from "./defaults.js"' in content
+        if not has_import:
+            return False, {"error": "DEFAULT_LLM_TIMEOUT_MS import from defaults.js not found"}
+
+        # Test that the import actually works
+        return self._node_check("timeout_imports")
+
+    def _check_moltbot_json_validity(self):
+        """docker/moltbot.json is valid JSON with provider configs"""
         try:
-            doc_path = os.path.join(self.app_dir, "docs/DEPLOY_COOLIFY.md")
-            
-            if not os.path.exists(doc_path):
-                self.failed_tests.append("docs/DEPLOY_COOLIFY.md")
-                self.log("❌ docs/DEPLOY_COOLIFY.md - FAILED: File does not exist")
-                self.test_results["deploy_coolify_docs"] = {
-                    "status": "FAILED",
-                    "error": "File does not exist"
-                }
-                return False
-            
-            with open(doc_path, "r") as f:
-                content = f.read()
-            
-            # Check for required environment variables documentation
-            required_env_vars = [
-                "DEFAULT_LLM_PROVIDER",
-                "LLM_STREAMING", 
-                "LLM_REQUEST_TIMEOUT_MS",
-                "GROQ_API_KEY",
-                "OPENROUTER_API_KEY",
-                "OLLAMA_BASE_URL"
-            ]
-            
-            missing_vars = []
-            for var in required_env_vars:
-                if var not in content:
-                    missing_vars.append(var)
-            
-            if missing_vars:
-                self.failed_tests.append("docs/DEPLOY_COOLIFY.md")
-                self.log(f"❌ docs/DEPLOY_COOLIFY.md - FAILED: Missing env vars: {', '.join(missing_vars)}")
-                self.test_results["deploy_coolify_docs"] = {
-                    "status": "FAILED",
-                    "error": f"Missing env vars: {', '.join(missing_vars)}"
-                }
-                return False
-            else:
-                self.tests_passed += 1
-                self.log("✅ docs/DEPLOY_COOLIFY.md - PASSED")
-                self.test_results["deploy_coolify_docs"] = {
-                    "status": "PASSED",
-                    "documented_vars": required_env_vars,
-                    "details": "All required environment variables documented"
-                }
-                return True
-                
-        except Exception as e:
-            self.failed_tests.append("docs/DEPLOY_COOLIFY.md")
-            self.log(f"❌ docs/DEPLOY_COOLIFY.md - ERROR: {str(e)}")
-            self.test_results["deploy_coolify_docs"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
-    
-    def test_env_example(self):
-        """Test that env.example has all new env vars documented"""
-        self.log("Testing env.example...")
-        self.tests_run += 1
-        
+            config = _read_json(os.path.join(self.app_dir, "docker/moltbot.json"))
+        except json.JSONDecodeError as e:
+            return False, {"error": f"Invalid JSON: {str(e)}"}
+
+        # Check for required provider configurations
+        required_providers = ["groq", "openrouter", "ollama"]
+        providers = config.get("models", {}).get("providers", {})
+        missing_providers = [provider for provider in required_providers if provider not in providers]
+
+        if missing_providers:
+            return False, {"error": f"Missing providers: {', '.join(missing_providers)}"}
+        return True, {
+            "providers": list(providers.keys()),
+            "details": "Valid JSON with all required provider configurations"
+        }
+
+    def _check_env_vars(self, relative_path: str, required_env_vars: List[str]):
+        """`relative_path` exists and mentions every name in `required_env_vars`"""
+        # Opening the file is the existence check; no separate stat first
         try:
-            env_path = os.path.join(self.app_dir, "env.example")
-            
-            if not os.path.exists(env_path):
-                self.failed_tests.append("env.example")
-                self.log("❌ env.example - FAILED: File does not exist")
-                self.test_results["env_example"] = {
-                    "status": "FAILED",
-                    "error": "File does not exist"
-                }
-                return False
-            
-            with open(env_path, "r") as f:
-                content = f.read()
-            
-            # Check for required environment variables
-            required_env_vars = [
-                "DEFAULT_LLM_PROVIDER",
-                "DEFAULT_MODEL",
-                "LLM_STREAMING",
-                "LLM_REQUEST_TIMEOUT_MS", 
-                "LLM_MAX_RETRIES",
-                "GROQ_API_KEY",
-                "OPENROUTER_API_KEY",
-                "OLLAMA_BASE_URL",
-                "OLLAMA_MODEL"
-            ]
-            
-            missing_vars = []
-            for var in required_env_vars:
-                if var not in content:
-                    missing_vars.append(var)
-            
-            if missing_vars:
-                self.failed_tests.append("env.example")
-                self.log(f"❌ env.example - FAILED: Missing env vars: {', '.join(missing_vars)}")
-                self.test_results["env_example"] = {
-                    "status": "FAILED",
-                    "error": f"Missing env vars: {', '.join(missing_vars)}"
-                }
-                return False
-            else:
-                self.tests_passed += 1
-                self.log("✅ env.example - PASSED")
-                self.test_results["env_example"] = {
-                    "status": "PASSED",
-                    "documented_vars": required_env_vars,
-                    "details": "All required environment variables documented"
-                }
-                return True
-                
-        except Exception as e:
-            self.failed_tests.append("env.example")
-            self.log(f"❌ env.example - ERROR: {str(e)}")
-            self.test_results["env_example"] = {
-                "status": "ERROR",
-                "error": str(e)
-            }
-            return False
+            missing_vars = _missing_names(os.path.join(self.app_dir, relative_path), required_env_vars)
+        except FileNotFoundError:
+            return False, {"error": "File does not exist"}
+
+        if missing_vars:
+            return False, {"error": f"Missing env vars: {', '.join(missing_vars)}"}
+        return True, {
+            "documented_vars": required_env_vars,
+            "details": "All required environment variables documented"
+        }
+
+    def _check_deploy_coolify_docs(self):
+        """docs/DEPLOY_COOLIFY.md exists and documents env vars"""
+        return self._check_env_vars("docs/DEPLOY_COOLIFY.md", [
+            "DEFAULT_LLM_PROVIDER",
+            "LLM_STREAMING",
+            "LLM_REQUEST_TIMEOUT_MS",
+            "GROQ_API_KEY",
+            "OPENROUTER_API_KEY",
+            "OLLAMA_BASE_URL"
+        ])
+
+    def _check_env_example(self):
+        """env.example has all new env vars documented"""
+        return self._check_env_vars("env.example", [
+            "DEFAULT_LLM_PROVIDER",
+            "DEFAULT_MODEL",
+            "LLM_STREAMING",
+            "LLM_REQUEST_TIMEOUT_MS",
+            "LLM_MAX_RETRIES",
+            "GROQ_API_KEY",
+            "OPENROUTER_API_KEY",
+            "OLLAMA_BASE_URL",
+            "OLLAMA_MODEL"
+        ])
     
     def run_all_tests(self):
         """Run all MoltBot LLM provider tests"""
         self.log("🚀 Starting MoltBot LLM Provider Reliability Test Suite")
         self.log("=" * 70)
         
-        # Test all components
-        self.test_defaults_exports()
-        self.test_llm_config_exports()
-        self.test_providers_handlers()
-        self.test_server_methods_integration()
-        self.test_server_methods_list()
-        self.test_timeout_imports()
-        self.test_moltbot_json_validity()
-        self.test_deploy_coolify_docs()
-        self.test_env_example()
+        # One worker call answers every Node-side check; fast mode never starts Node
+        if not self.fast:
+            self.batch_results = self.run_node_checks()
+
+        # Test all components; they are independent, so run them side by side
+        with ThreadPoolExecutor(max_workers=len(self._specs)) as pool:
+            outcomes = list(pool.map(self._run, self._specs))
+        self._aggregate(outcomes)
+        
+        self.close()
         
         # Print summary
         self.print_summary()
@@ -790,8 +730,8 @@ class MoltBotLLMProviderTestSuite:
                 "detailed_results": self.test_results
             }
             
-            with open("/app/moltbot_llm_provider_test_results.json", "w") as f:
-                json.dump(results, f, indent=2)
+            with open("/app/moltbot_llm_provider_test_results.json", "wb", buffering=65536) as f:
+                f.write(json_dumps_pretty(results))
                 
             self.log("📄 Detailed test results saved to /app/moltbot_llm_provider_test_results.json")
             
@@ -800,7 +740,13 @@ class MoltBotLLMProviderTestSuite:
 
 def main():
     """Main test runner"""
-    suite = MoltBotLLMProviderTestSuite()
+    parser = argparse.ArgumentParser(description="Run the MoltBot LLM provider reliability tests.")
+    parser.add_argument("--fast", action="store_true",
+                        help="check the built modules by scanning their source instead of loading them "
+                             "in Node; release CI should run the full mode")
+    args = parser.parse_args()
+
+    suite = MoltBotLLMProviderTestSuite(fast=args.fast)
     success = suite.run_all_tests()
     
     return 0 if success else 1
@@ -5,77 +5,140 @@ Tests the basic structure and existence of security modules.
 """
 
 import sys
+import functools
 import json
 import os
+import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode("utf-8")
+
+
+def json_dumps_pretty(obj: Any) -> bytes:
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+@functools.lru_cache(maxsize=64)
+def _dir_entries(directory: str) -> frozenset:
+    """Names in a directory that os.path.exists would report, from one scandir pass"""
+    with os.scandir(directory) as entries:
+        # A dangling symlink is listed but does not exist
+        return frozenset(e.name for e in entries if not e.is_symlink() or os.path.exists(e.path))
+
+
 class SimpleCybersecurityTest:
+    RESULTS_PATH = "/app/simple_cybersecurity_test_results.json"
+    # One JSON object per line, appended as each test finishes
+    RESULTS_STREAM_PATH = "/app/simple_cybersecurity_test_results.jsonl"
+    
     def __init__(self):
         self.tests_run = 0
         self.tests_passed = 0
         self.failed_tests = []
         self.test_results = {}
+        self._results_stream = None
+        # path -> (mtime, content) for files already read by test_file_contains
+        self._file_cache: Dict[str, tuple] = {}
+        self._last_ts_sec = -1
+        self._last_ts_str = ""
         
     def log(self, message: str, level: str = "INFO"):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {level}: {message}")
+        # Reformat the timestamp only when the wall-clock second changes
+        now = int(time.time())
+        if now != self._last_ts_sec:
+            self._last_ts_str = time.strftime("%H:%M:%S", time.localtime(now))
+            self._last_ts_sec = now
+        print(f"[{self._last_ts_str}] {level}: {message}")
+    
+    def _read(self, path: str) -> str:
+        """Read a text file, reusing the cached content while its mtime is unchanged"""
+        mtime = os.stat(path).st_mtime
+        cached = self._file_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, 'r', encoding='utf-8', buffering=65536) as f:
+            content = f.read()
+        self._file_cache[path] = (mtime, content)
+        return content
+    
+    def _record(self, key: str, result: Dict[str, Any]):
+        """Store a test result and append it to the results stream"""
+        self.test_results[key] = result
+        if self._results_stream is not None:
+            self._results_stream.write(json_dumps({"test": key, **result}) + b"\n")
     
     def test_file_exists(self, file_path: str, test_name: str) -> bool:
         """Test if a file exists"""
         self.tests_run += 1
+        key = test_name.lower().replace(" ", "_")
+        
+        directory, name = os.path.split(file_path)
+        try:
+            exists = name in _dir_entries(directory)
+        except OSError:
+            exists = os.path.exists(file_path)
         
-        if os.path.exists(file_path):
+        if exists:
             self.tests_passed += 1
             self.log(f"✅ {test_name} - PASSED")
-            self.test_results[test_name.lower().replace(" ", "_")] = {
+            self._record(key, {
                 "status": "PASSED",
                 "details": f"File exists at {file_path}"
-            }
+            })
             return True
         else:
             self.failed_tests.append(test_name)
             self.log(f"❌ {test_name} - FAILED: File not found at {file_path}")
-            self.test_results[test_name.lower().replace(" ", "_")] = {
+            self._record(key, {
                 "status": "FAILED",
                 "error": f"File not found at {file_path}"
-            }
+            })
             return False
     
     def test_file_contains(self, file_path: str, search_terms: List[str], test_name: str) -> bool:
         """Test if a file contains specific terms"""
         self.tests_run += 1
+        key = test_name.lower().replace(" ", "_")
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = self._read(file_path)
             
             missing_terms = [term for term in search_terms if term not in content]
             
             if not missing_terms:
                 self.tests_passed += 1
                 self.log(f"✅ {test_name} - PASSED")
-                self.test_results[test_name.lower().replace(" ", "_")] = {
+                self._record(key, {
                     "status": "PASSED",
                     "details": f"All {len(search_terms)} terms found"
-                }
+                })
                 return True
             else:
                 self.failed_tests.append(test_name)
                 self.log(f"❌ {test_name} - FAILED: Missing terms: {missing_terms}")
-                self.test_results[test_name.lower().replace(" ", "_")] = {
+                self._record(key, {
                     "status": "FAILED",
                     "error": f"Missing terms: {missing_terms}"
-                }
+                })
                 return False
                 
         except Exception as e:
             self.failed_tests.append(test_name)
             self.log(f"❌ {test_name} - ERROR: {str(e)}")
-            self.test_results[test_name.lower().replace(" ", "_")] = {
+            self._record(key, {
                 "status": "ERROR",
                 "error": str(e)
-            }
+            })
             return False
     
     def run_all_tests(self):
@@ -83,6 +146,11 @@ class SimpleCybersecurityTest:
         self.log("🛡️  Starting Simple Cybersecurity Defense System Test Suite")
         self.log("=" * 60)
         
+        try:
+            self._results_stream = open(self.RESULTS_STREAM_PATH, "wb", buffering=65536)
+        except OSError as e:
+            self.log(f"⚠️  Could not open results stream: {str(e)}")
+        
         # Test source files exist
         self.test_file_exists("/app/src/security/firewall.ts", "Firewall source file exists")
         self.test_file_exists("/app/src/security/gateway-protection.ts", "Gateway protection source file exists")
@@ -201,6 +269,11 @@ class SimpleCybersecurityTest:
     
     def save_test_results(self):
         """Save detailed test results to file"""
+        if self._results_stream is not None:
+            self._results_stream.close()
+            self._results_stream = None
+            self.log(f"📄 Per-test results streamed to {self.RESULTS_STREAM_PATH}")
+        
         try:
             results = {
                 "timestamp": datetime.now().isoformat(),
@@ -214,10 +287,10 @@ class SimpleCybersecurityTest:
                 "detailed_results": self.test_results
             }
             
-            with open("/app/simple_cybersecurity_test_results.json", "w") as f:
-                json.dump(results, f, indent=2)
+            with open(self.RESULTS_PATH, "wb", buffering=65536) as f:
+                f.write(json_dumps_pretty(results))
                 
-            self.log("📄 Detailed test results saved to /app/simple_cybersecurity_test_results.json")
+            self.log(f"📄 Detailed test results saved to {self.RESULTS_PATH}")
             
         except Exception as e:
             self.log(f"⚠️  Could not save test results: {str(e)}")
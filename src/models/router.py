@@ -1,49 +1,214 @@
 import os
+import re
+import asyncio
+import copy
+import functools
+import socket
+import weakref
 import yaml
 import httpx
-from typing import Optional, Dict, Any, AsyncGenerator
+from typing import Optional, Dict, Any, AsyncGenerator, Union
 from pathlib import Path
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+# Prefer the libyaml-backed loader; the pure-Python one is several times slower
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
+# httpx only speaks HTTP/2 when the optional h2 package is installed
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+# Repository root (src/models/router.py -> ../../); config paths are relative to it
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+@functools.lru_cache(maxsize=8)
+def _load_yaml_cached(path_str: str, mtime: float) -> Dict[str, Any]:
+    """Parse a YAML file once per (path, mtime); an edited file is parsed again
+    
+    The result is shared by every caller, so callers must copy it before handing it out.
+    """
+    with open(path_str, 'r') as f:
+        return yaml.load(f, Loader=_SafeLoader)
+
+
+def _shutdown_sockets(client: httpx.AsyncClient):
+    """Best-effort teardown of a client whose event loop has closed
+    
+    aclose() needs the client's own loop, so instead shut down each pooled
+    connection's socket; the descriptors are freed once the client is collected.
+    """
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    for connection in list(getattr(pool, "connections", ())):
+        stream = getattr(getattr(connection, "_connection", None), "_network_stream", None)
+        try:
+            sock = stream.get_extra_info("socket") if stream is not None else None
+            if sock is not None:
+                sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            # Already closed or an httpcore layout we do not know; nothing more to do
+            pass
+
+
+async def _no_chunks() -> AsyncGenerator[str, None]:
+    """An empty chunk stream"""
+    return
+    yield
+
+
 class ModelRouter:
+    # Substring keywords per task type, checked in this order
+    TASK_KEYWORDS = {
+        "coding": ["code", "function", "bug", "error", "python", "javascript", "typescript", "html", "css", "sql", "api", "database"],
+        "reasoning": ["calculate", "math", "solve", "equation", "logic", "reasoning", "proof", "algorithm"],
+        "creative_writing": ["write", "story", "poem", "creative", "essay", "blog", "article", "draft"],
+    }
+    
+    # Constant request headers per provider; Authorization is added per call
+    PROVIDER_HEADERS = {
+        "moonshot": {
+            "Content-Type": "application/json"
+        },
+        "openrouter": {
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://clawdbot.app",
+            "X-Title": "Clawdbot"
+        },
+    }
+    
     def __init__(self, config_path: str = "config/models.yaml"):
         self.config = self._load_config(config_path)
         self.default_model = self.config.get("default_model", "kimi-k2.5")
         self.providers = self.config.get("providers", {})
         self.task_routing = self.config.get("task_routing", {})
         self.auto_switch = self.config.get("auto_switch", {})
+        self._model_index = self._build_model_index()
+        # One alternation per task type: a single C-level scan instead of a Python loop of `in` checks
+        self._task_patterns = [
+            (task, re.compile("|".join(re.escape(kw) for kw in keywords)))
+            for task, keywords in self.TASK_KEYWORDS.items()
+        ]
+        # One pooled client per event loop, created on first use; connections cannot cross loops
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # API keys already read from the environment, by provider
+        self._api_keys: Dict[str, str] = {}
+        self._provider_dispatch = {
+            "moonshot": self._call_moonshot,
+            "openrouter": self._call_openrouter,
+        }
         
-    def _load_config(self, path: str) -> Dict[str, Any]:
+    @classmethod
+    def _load_config(cls, path: str) -> Dict[str, Any]:
         """Load model configuration from YAML"""
-        config_full_path = Path(__file__).parent.parent.parent / path
-        with open(config_full_path, 'r') as f:
-            return yaml.safe_load(f)
+        config_full_path = _PROJECT_ROOT / path
+        # Each router gets its own copy so mutating one cannot corrupt the cached parse
+        return copy.deepcopy(_load_yaml_cached(str(config_full_path), config_full_path.stat().st_mtime))
+    
+    @classmethod
+    async def aload_config(cls, path: str = "config/models.yaml") -> Dict[str, Any]:
+        """Load model configuration in a worker thread without blocking the event loop
+        
+        The parsed file is cached, so awaiting this before constructing a
+        ModelRouter for the same path keeps the parse off the loop.
+        """
+        return await asyncio.to_thread(cls._load_config, path)
+    
+    async def _client_get(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client for the running event loop, creating it on first use
+        
+        There is no await between the lookup and the assignment, so concurrent
+        callers on one loop cannot create two clients.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            self._discard_closed_loop_clients()
+            client = self._clients[loop] = httpx.AsyncClient(
+                http2=_HTTP2,
+                timeout=httpx.Timeout(60.0),
+                # Keep idle provider connections open so warmed-up TLS sessions survive
+                limits=httpx.Limits(
+                    max_keepalive_connections=32,
+                    max_connections=64,
+                    keepalive_expiry=600
+                )
+            )
+        return client
+    
+    def _discard_closed_loop_clients(self):
+        """Forget clients whose event loop has closed, shutting down their sockets
+        
+        A client only learns its loop is gone here or in aclose(), so callers that
+        end their loop (e.g. asyncio.run) should await aclose() first; otherwise its
+        idle connections stay open until the router is next used.
+        """
+        for loop, client in list(self._clients.items()):
+            if loop.is_closed():
+                del self._clients[loop]
+                _shutdown_sockets(client)
+    
+    async def warmup(self):
+        """Open a pooled connection to each provider ahead of the first request"""
+        client = await self._client_get()
+        
+        async def touch(base_url: str):
+            try:
+                await client.get(base_url, timeout=5.0)
+            except httpx.HTTPError:
+                # Best effort: the real request will connect on its own
+                pass
+        
+        await asyncio.gather(*(
+            touch(provider_config["base_url"])
+            for provider_config in self.providers.values()
+            if provider_config.get("base_url")
+        ))
+    
+    async def aclose(self):
+        """Close this loop's HTTP client and its pooled connections
+        
+        Clients of loops that have since closed are torn down too; those of other
+        loops that are still running are left for their own aclose().
+        """
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        self._discard_closed_loop_clients()
+        if client is not None:
+            await client.aclose()
     
     def get_api_key(self, provider: str) -> str:
         """Get API key from environment variable"""
+        api_key = self._api_keys.get(provider)
+        if api_key:
+            return api_key
         env_var = self.providers[provider]["api_key_env"]
         api_key = os.getenv(env_var)
         if not api_key:
             raise ValueError(f"Missing API key: {env_var}")
+        self._api_keys[provider] = api_key
         return api_key
     
     def detect_task_type(self, message: str) -> str:
         """Detect task type from message content"""
         message_lower = message.lower()
         
-        # Coding detection
-        code_keywords = ["code", "function", "bug", "error", "python", "javascript", "typescript", "html", "css", "sql", "api", "database"]
-        if any(kw in message_lower for kw in code_keywords):
-            return "coding"
-        
-        # Math/reasoning detection
-        math_keywords = ["calculate", "math", "solve", "equation", "logic", "reasoning", "proof", "algorithm"]
-        if any(kw in message_lower for kw in math_keywords):
-            return "reasoning"
-        
-        # Creative writing detection
-        creative_keywords = ["write", "story", "poem", "creative", "essay", "blog", "article", "draft"]
-        if any(kw in message_lower for kw in creative_keywords):
-            return "creative_writing"
+        # Coding, then math/reasoning, then creative writing keywords
+        for task, pattern in self._task_patterns:
+            if pattern.search(message_lower):
+                return task
         
         # Long context detection (length-based)
         if len(message) > 4000:
@@ -69,53 +234,60 @@ class ModelRouter:
         primary_id = routing.get("primary", self.default_model)
         fallback_id = routing.get("fallback", self.default_model)
         
-        # Try primary, fallback to default if not available
-        try:
-            return self._get_model_config(primary_id)
-        except:
-            return self._get_model_config(fallback_id)
+        # Use primary if it is a known model, otherwise the fallback
+        target = primary_id if primary_id in self._model_index else fallback_id
+        return self._get_model_config(target)
+    
+    def _build_model_index(self) -> Dict[str, tuple]:
+        """Map every model name _get_model_config accepts to (provider, provider_config, model_config)"""
+        index: Dict[str, tuple] = {}
+        
+        # OpenRouter models match by id or key; the first listed model wins
+        if "openrouter" in self.providers:
+            or_config = self.providers["openrouter"]
+            for key, config in or_config.get("models", {}).items():
+                for name in (config.get("id"), key):
+                    if name is not None:
+                        index.setdefault(name, ("openrouter", or_config, config))
+        
+        # Moonshot models match by key and take precedence over OpenRouter
+        if "moonshot" in self.providers:
+            moonshot_config = self.providers["moonshot"]
+            for key, config in moonshot_config.get("models", {}).items():
+                index[key] = ("moonshot", moonshot_config, config)
+        
+        return index
     
     def _get_model_config(self, model_id: str) -> Dict[str, Any]:
         """Get full configuration for a model"""
-        # Check Moonshot
-        if "moonshot" in self.providers:
-            moonshot_models = self.providers["moonshot"].get("models", {})
-            if model_id in moonshot_models:
-                return {
-                    "provider": "moonshot",
-                    "provider_config": self.providers["moonshot"],
-                    **moonshot_models[model_id]
-                }
-        
-        # Check OpenRouter
-        if "openrouter" in self.providers:
-            or_models = self.providers["openrouter"].get("models", {})
-            for key, config in or_models.items():
-                if config.get("id") == model_id or key == model_id:
-                    return {
-                        "provider": "openrouter",
-                        "provider_config": self.providers["openrouter"],
-                        **config
-                    }
-        
-        raise ValueError(f"Model not found: {model_id}")
-    
-    async def chat_completion(
+        try:
+            provider, provider_config, config = self._model_index[model_id]
+        except KeyError:
+            raise ValueError(f"Model not found: {model_id}") from None
+        return {
+            "provider": provider,
+            "provider_config": provider_config,
+            **config
+        }
+    
+    def chat_completion(
         self, 
         message: str, 
         model: Optional[str] = None,
         stream: bool = False
     ) -> AsyncGenerator[str, None]:
-        """Send chat completion request to selected model"""
-        model_config = self.select_model(message, model)
-        provider = model_config["provider"]
+        """Send chat completion request to selected model
         
-        if provider == "moonshot":
-            async for chunk in self._call_moonshot(message, model_config, stream):
-                yield chunk
-        elif provider == "openrouter":
-            async for chunk in self._call_openrouter(message, model_config, stream):
-                yield chunk
+        The model is selected when this is called, so an unknown model raises
+        here rather than on the first iteration. A provider without a call
+        method yields nothing.
+        """
+        model_config = self.select_model(message, model)
+        call = self._provider_dispatch.get(model_config["provider"])
+        if call is None:
+            return _no_chunks()
+        # Hand back the provider's generator itself rather than re-yielding each chunk
+        return call(message, model_config, stream)
     
     async def _call_moonshot(
         self, 
@@ -127,42 +299,12 @@ class ModelRouter:
         api_key = self.get_api_key("moonshot")
         base_url = model_config["provider_config"]["base_url"]
         
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": model_config["id"],
-            "messages": [{"role": "user", "content": message}],
-            "stream": stream,
-            "max_tokens": model_config.get("max_tokens", 4096)
-        }
+        headers = {"Authorization": f"Bearer {api_key}", **self.PROVIDER_HEADERS["moonshot"]}
         
-        async with httpx.AsyncClient() as client:
-            if stream:
-                async with client.stream(
-                    "POST",
-                    f"{base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=60.0
-                ) as response:
-                    async for line in response.aiter_lines():
-                        if line.startswith("data: "):
-                            data = line[6:]
-                            if data == "[DONE]":
-                                break
-                            yield self._extract_content(data)
-            else:
-                response = await client.post(
-                    f"{base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=60.0
-                )
-                data = response.json()
-                yield data["choices"][0]["message"]["content"]
+        async for chunk in self._chat(
+            f"{base_url}/chat/completions", headers, message, model_config, stream
+        ):
+            yield chunk
     
     async def _call_openrouter(
         self, 
@@ -174,13 +316,22 @@ class ModelRouter:
         api_key = self.get_api_key("openrouter")
         base_url = model_config["provider_config"]["base_url"]
         
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://clawdbot.app",
-            "X-Title": "Clawdbot"
-        }
+        headers = {"Authorization": f"Bearer {api_key}", **self.PROVIDER_HEADERS["openrouter"]}
         
+        async for chunk in self._chat(
+            f"{base_url}/chat/completions", headers, message, model_config, stream
+        ):
+            yield chunk
+    
+    async def _chat(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        message: str,
+        model_config: Dict[str, Any],
+        stream: bool
+    ) -> AsyncGenerator[str, None]:
+        """Send an OpenAI-compatible chat completion request"""
         payload = {
             "model": model_config["id"],
             "messages": [{"role": "user", "content": message}],
@@ -188,39 +339,64 @@ class ModelRouter:
             "max_tokens": model_config.get("max_tokens", 4096)
         }
         
-        async with httpx.AsyncClient() as client:
-            if stream:
-                async with client.stream(
-                    "POST",
-                    f"{base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=60.0
-                ) as response:
-                    async for line in response.aiter_lines():
-                        if line.startswith("data: "):
-                            data = line[6:]
-                            if data == "[DONE]":
-                                break
-                            yield self._extract_content(data)
-            else:
-                response = await client.post(
-                    f"{base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=60.0
-                )
-                data = response.json()
-                yield data["choices"][0]["message"]["content"]
+        client = await self._client_get()
+        if stream:
+            async for chunk in self._stream_chat(client, url, headers, payload):
+                yield chunk
+        else:
+            response = await client.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=60.0
+            )
+            data = response.json()
+            yield data["choices"][0]["message"]["content"]
+    
+    async def _stream_chat(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Yield content deltas from an SSE chat completion stream"""
+        extract = self._extract_content
+        async with client.stream(
+            "POST",
+            url,
+            headers=headers,
+            json=payload,
+            timeout=60.0
+        ) as response:
+            # Split lines out of raw network chunks ourselves so one await
+            # covers every event that arrived in the same read
+            buf = bytearray()
+            async for chunk in response.aiter_bytes(16384):
+                buf += chunk
+                start = 0
+                while (nl := buf.find(b"\n", start)) != -1:
+                    line = bytes(buf[start:nl]).rstrip(b"\r")
+                    start = nl + 1
+                    # Skip blank keep-alives and non-data fields (event:, id:, ...)
+                    if len(line) < 7 or line[:6] != b"data: ":
+                        continue
+                    data = line[6:]
+                    if data == b"[DONE]":
+                        return
+                    yield extract(data)
+                del buf[:start]
+            # A final event without a trailing newline
+            line = bytes(buf).rstrip(b"\r")
+            if len(line) > 6 and line[:6] == b"data: " and line[6:] != b"[DONE]":
+                yield extract(line[6:])
     
-    def _extract_content(self, data: str) -> str:
+    def _extract_content(self, data: Union[str, bytes]) -> str:
         """Extract content from SSE stream"""
-        import json
         try:
-            parsed = json.loads(data)
-            delta = parsed["choices"][0].get("delta", {})
-            return delta.get("content", "")
-        except:
+            return _loads(data)["choices"][0].get("delta", {}).get("content", "")
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            # Malformed or non-delta events carry no content
             return ""
 
 # Singleton instance for import